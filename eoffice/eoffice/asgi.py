@@ -2,6 +2,8 @@
 ASGI config for eoffice project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the project through it (e.g. ``uvicorn eoffice.asgi:application``) so the
+long-lived task event stream doesn't tie up a WSGI worker per client.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
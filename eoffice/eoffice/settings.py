@@ -45,16 +45,53 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tasks.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tasks.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 ROOT_URLCONF = 'eoffice.urls'
 
+# Shared cache for sessions, the session user, roles, the assignee directory and page
+# versions. Point CACHE_URL at Redis (e.g. redis://localhost:6379/1) whenever more than
+# one process serves requests; the local-memory fallback is per process (tests, dev).
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'eoffice',
+            'TIMEOUT': 60 * 60,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'eoffice',
+        }
+    }
+
+# Sessions are read from the cache and only fall back to the database on a miss
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+# Flash messages travel in a cookie, only spilling into the session when too large
+MESSAGE_STORAGE = 'django.contrib.messages.storage.fallback.FallbackStorage'
+# ModelBackend stays listed so sessions logged in before the cached backend (whose
+# session records that backend's path) keep working; drop it once they have expired.
+AUTHENTICATION_BACKENDS = [
+    'tasks.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# The cached session user is dropped when the user is saved; this bounds how long a
+# change made with a queryset update() (e.g. deactivating users in bulk) goes unseen
+AUTH_USER_CACHE_SECONDS = config('AUTH_USER_CACHE_SECONDS', cast=int, default=60)
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -66,6 +103,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'tasks.events.live_events',
             ],
         },
     },
@@ -77,12 +115,61 @@ WSGI_APPLICATION = 'eoffice.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgres for production; SQLite is tuned for a single node (set SQLITE_WAL=1 on
+# a deployed file so pages read while a status update writes). Move existing data over with
+# `manage.py copy_database`.
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='eoffice'),
+            'USER': config('DB_USER', default='eoffice'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Keep connections open between requests, checking they still work before reuse
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', cast=int, default=60),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', cast=int, default=5),
+            },
+        }
     }
-}
+    if config('DB_POOL', cast=bool, default=False):
+        # psycopg 3 connection pool inside each process; replaces persistent connections.
+        # Leave off behind PgBouncer in transaction mode.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', cast=int, default=2),
+            'max_size': config('DB_POOL_MAX_SIZE', cast=int, default=10),
+            'timeout': config('DB_POOL_TIMEOUT', cast=int, default=10),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                # Take the write lock up front instead of failing to upgrade a read lock
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': config('DB_BUSY_TIMEOUT', cast=int, default=20),
+                'init_command': (
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA temp_store=MEMORY;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA mmap_size=134217728;'
+                ),
+            },
+        }
+    }
+    # WAL is a property of the file and sticks once set (with -wal/-shm files beside it),
+    # so it is opt-in rather than applied to whatever database a command happens to open.
+    if config('SQLITE_WAL', cast=bool, default=False):
+        DATABASES['default']['OPTIONS']['init_command'] = (
+            'PRAGMA journal_mode=WAL;' + DATABASES['default']['OPTIONS']['init_command']
+        )
 
 
 # Password validation
@@ -142,12 +229,69 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Attachment processing is slow and CPU-bound, so it has its own queue; run a separate
+# worker for it, e.g. `celery -A eoffice worker -Q attachments`, sized with
+# CELERY_WORKER_CONCURRENCY in that worker's environment (defaults to the CPU count).
+CELERY_TASK_ROUTES = {
+    'tasks.tasks.process_attachment': {'queue': config('ATTACHMENT_QUEUE', default='attachments')},
+}
+CELERY_WORKER_CONCURRENCY = config('CELERY_WORKER_CONCURRENCY', cast=int, default=0) or None
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    'refresh-overdue-summaries': {
+        'task': 'tasks.tasks.refresh_overdue_summaries',
+        'schedule': config('OVERDUE_SUMMARY_REFRESH_SECONDS', cast=int, default=300),
+    },
+    'scan-overdue-tasks': {
+        'task': 'tasks.tasks.scan_overdue_tasks',
+        'schedule': config('OVERDUE_SCAN_SECONDS', cast=int, default=60),
+    },
+    'purge-upload-sessions': {
+        'task': 'tasks.tasks.purge_upload_sessions',
+        'schedule': 60 * 60,
+    },
+    'archive-completed-tasks': {
+        'task': 'tasks.tasks.archive_completed_tasks',
+        'schedule': config('AUTO_ARCHIVE_SECONDS', cast=int, default=60 * 60),
+    },
+    'move-archived-tasks': {
+        'task': 'tasks.tasks.move_archived_tasks',
+        'schedule': config('ARCHIVE_MOVE_SECONDS', cast=int, default=15 * 60),
+    },
+}
 
 # Twilio Configuration
 TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN', default='')
 TWILIO_PHONE_NUMBER = config('TWILIO_PHONE_NUMBER', default='')
 
+# SMS notifications
+# Use 'tasks.tasks.LocmemSMSBackend' to keep messages in memory (tests, offline development)
+SMS_BACKEND = config('SMS_BACKEND', default='tasks.tasks.TextBeltSMSBackend')
+TEXTBELT_URL = config('TEXTBELT_URL', default='https://textbelt.com/text')
+TEXTBELT_KEY = config('TEXTBELT_KEY', default='textbelt')  # Free key for 1 SMS/day
+SMS_TIMEOUT = config('SMS_TIMEOUT', cast=float, default=10)  # Seconds per HTTP request
+SMS_MAX_RETRIES = config('SMS_MAX_RETRIES', cast=int, default=3)  # Connection-level retries per attempt
+SMS_MAX_ATTEMPTS = config('SMS_MAX_ATTEMPTS', cast=int, default=5)  # Delivery attempts before giving up
+SMS_RETRY_BACKOFF = config('SMS_RETRY_BACKOFF', cast=int, default=30)  # Seconds, doubled per attempt
+NOTIFICATION_COALESCE_SECONDS = config('NOTIFICATION_COALESCE_SECONDS', cast=int, default=60)
+SITE_URL = config('SITE_URL', default='http://127.0.0.1:8000')
+
+# Task search: empty picks SQLite FTS5 or PostgreSQL tsvector from the database vendor,
+# 'tasks.search.LikeSearchBackend' forces unindexed LIKE matching
+TASK_SEARCH_BACKEND = config('TASK_SEARCH_BACKEND', default='')
+
+# Listing pages: how long rendered pages are cached, and how often their
+# ETag/Last-Modified roll over so deadlines and countdowns stay current
+DASHBOARD_CACHE_SECONDS = config('DASHBOARD_CACHE_SECONDS', cast=int, default=60)
+
+# Live task/reminder events, only when served over ASGI (e.g. `uvicorn eoffice.asgi:application`);
+# under WSGI pages don't open the stream and it answers 204. InMemoryBroker only reaches clients
+# connected to the same process; use 'tasks.events.RedisBroker' with several workers
+TASK_EVENTS_BROKER = config('TASK_EVENTS_BROKER', default='tasks.events.InMemoryBroker')
+TASK_EVENTS_REDIS_URL = config('TASK_EVENTS_REDIS_URL', default='redis://localhost:6379/1')
+TASK_EVENTS_HEARTBEAT_SECONDS = config('TASK_EVENTS_HEARTBEAT_SECONDS', cast=int, default=15)
+
 LOGIN_REDIRECT_URL = 'task_list'  # Redirect to tasks/ after login
 LOGOUT_REDIRECT_URL = 'login'     # Redirect to login/ after logout
 LOGIN_URL = 'login'               # Redirect to login/ for unauthenticated users
@@ -156,6 +300,44 @@ LOGIN_URL = 'login'               # Redirect to login/ for unauthenticated users
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Chunked task file uploads: partial files are kept outside MEDIA_ROOT until complete
+UPLOAD_SESSION_DIR = config('UPLOAD_SESSION_DIR', default=str(BASE_DIR / 'upload_sessions'))
+UPLOAD_MAX_BYTES = config('UPLOAD_MAX_BYTES', cast=int, default=500 * 1024 * 1024)
+UPLOAD_CHUNK_MAX_BYTES = config('UPLOAD_CHUNK_MAX_BYTES', cast=int, default=8 * 1024 * 1024)
+UPLOAD_SESSION_TTL_HOURS = config('UPLOAD_SESSION_TTL_HOURS', cast=int, default=24)
+
+# Task files are only served through the authorizing download view. In production let
+# the front server send them: 'nginx' (X-Accel-Redirect to an internal location that
+# aliases MEDIA_ROOT) or 'sendfile' (Apache mod_xsendfile / lighttpd); blank streams them
+# from Django.
+TASK_FILE_SENDFILE = config('TASK_FILE_SENDFILE', default='')
+TASK_FILE_ACCEL_PREFIX = config('TASK_FILE_ACCEL_PREFIX', default='/protected-media/')
+
+# Text extracted from attachments for search is cut off at this many characters
+ATTACHMENT_TEXT_MAX_CHARS = config('ATTACHMENT_TEXT_MAX_CHARS', cast=int, default=100_000)
+
+# Archived tasks are moved out of the live table this many rows per transaction
+ARCHIVE_MOVE_BATCH_SIZE = config('ARCHIVE_MOVE_BATCH_SIZE', cast=int, default=1000)
+# Tasks signed and dispatched this many days ago are archived automatically,
+# this many per transaction. Off (0) unless set, since the first run after
+# turning it on moves every older signed task out of the live listings at once.
+AUTO_ARCHIVE_AFTER_DAYS = config('AUTO_ARCHIVE_AFTER_DAYS', cast=int, default=0)
+AUTO_ARCHIVE_BATCH_SIZE = config('AUTO_ARCHIVE_BATCH_SIZE', cast=int, default=500)
+
+# Request metrics (tasks.metrics): Prometheus text at /tasks/metrics/ for staff users or
+# `Authorization: Bearer <METRICS_TOKEN>`. Requests slower than SLOW_REQUEST_MS, or running
+# more queries than their view's budget, are logged with their SQL.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', cast=int, default=500)
+QUERY_BUDGETS = {
+    'task_list': 5,
+    'manager_dashboard': 6,
+    'employee_dashboard': 7,
+    'archived_dashboard': 5,
+    'api_task_list': 4,
+    'api_reminder_list': 5,
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -169,5 +351,9 @@ LOGGING = {
             'handlers': ['console'],
             'level': 'DEBUG',
         },
+        'tasks': {
+            'handlers': ['console'],
+            'level': config('TASKS_LOG_LEVEL', default='INFO'),
+        },
     },
 }
\ No newline at end of file
@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import Notification
 
-# Register your models here.
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created_at', 'sent_at')
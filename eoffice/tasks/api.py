@@ -0,0 +1,459 @@
+import json
+import os
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.forms import modelform_factory
+from django.forms.models import model_to_dict
+from django.http import Http404, JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.middleware.http import ConditionalGetMiddleware
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.generic import View
+
+try:
+    import brotli
+except ImportError:  # Listed in requirements.txt; responses are gzipped without it
+    brotli = None
+
+from .attachments import warn_missing
+from .conditional import ConditionalGetMixin
+from .forms import BulkTaskActionForm, TaskForm
+from .models import ArchivedTask, Profile, Reminder, Task, TaskEvent, UploadSession
+from .pagination import InvalidCursor, KeysetPaginator
+from .storage import file_digest, get_task_file_storage
+from .tasks import queue_task_assignment_notification
+
+STATUS_LABELS = dict(Task.STATUS_CHOICES)
+BROTLI_RE = re.compile(r'\bbr\b')
+UPLOAD_READ_SIZE = 64 * 1024
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.errors = errors
+
+
+def error_response(status, message, errors=None):
+    data = {'error': message}
+    if errors:
+        data['errors'] = errors
+    return JsonResponse(data, status=status)
+
+
+def compress(request, response):
+    """Brotli when the client accepts it and the library is installed, gzip otherwise."""
+    accepts_brotli = BROTLI_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if brotli is None and accepts_brotli:
+        warn_missing('Brotli', "API responses are gzipped instead")
+    if brotli is None or not accepts_brotli or response.streaming or response.has_header('Content-Encoding'):
+        return GZipMiddleware(lambda request: response).process_response(request, response)
+    if len(response.content) < 200:
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    compressed = brotli.compress(response.content)
+    if len(compressed) >= len(response.content):
+        return response
+    response.content = compressed
+    response.headers['Content-Length'] = str(len(compressed))
+    response.headers['Content-Encoding'] = 'br'
+    # The compressed body is no longer byte-identical to what the ETag named.
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response.headers['ETag'] = 'W/' + etag
+    return response
+
+
+class Projection:
+    """
+    Maps API field names to ``values()`` lookups, so a request selects only
+    the columns it asked for (``?fields=id,title``) and no model is built.
+    ``computed`` fields are derived in Python from one looked-up value, or
+    from several when the lookup is a tuple.
+    """
+
+    def __init__(self, columns, default, computed=None):
+        self.columns = columns
+        self.default = default
+        self.computed = computed or {}
+
+    def fields(self, request):
+        requested = request.GET.get('fields')
+        if not requested:
+            return list(self.default)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.columns and name not in self.computed]
+        if unknown:
+            raise ApiError(400, f"Unknown field(s): {', '.join(unknown)}.")
+        return names
+
+    def lookup(self, name):
+        lookup = self.computed[name][0] if name in self.computed else self.columns[name]
+        return list(lookup) if isinstance(lookup, tuple) else [lookup]
+
+    def lookups(self, names, extra=()):
+        lookups = []
+        for lookup in [lookup for name in names for lookup in self.lookup(name)] + list(extra):
+            if lookup not in lookups:
+                lookups.append(lookup)
+        return lookups
+
+    def serialize(self, row, names):
+        data = {}
+        for name in names:
+            if name in self.computed:
+                compute = self.computed[name][1]
+                data[name] = compute(*[row[key] for key in self.lookup(name)])
+            else:
+                data[name] = row[self.columns[name]]
+        return data
+
+
+def file_url(pk, name):
+    return reverse('task_file', args=[pk]) if name else None
+
+
+TASKS = Projection(
+    columns={
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'status': 'status',
+        'deadline': 'deadline',
+        'is_archived': 'is_archived',
+        'assignee': 'assignee_id',
+        'assignee_username': 'assignee__username',
+        'created_by': 'created_by_id',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+        'search_snippet': 'search_snippet',
+    },
+    computed={
+        'status_display': ('status', STATUS_LABELS.get),
+        'progress': ('status', lambda status: Task.PROGRESS.get(status, 0)),
+        'file': (('id', 'file'), file_url),
+    },
+    default=('id', 'title', 'status', 'deadline', 'assignee', 'assignee_username', 'updated_at'),
+)
+
+REMINDERS = Projection(
+    columns={
+        'id': 'id',
+        'user': 'user_id',
+        'created_by': 'created_by_id',
+        'created_by_username': 'created_by__username',
+        'message': 'message',
+        'is_active': 'is_active',
+        'is_dismissed': 'is_dismissed',
+        'created_at': 'created_at',
+    },
+    computed={'tasks': ('id', None)},  # Filled in with one query per page
+    default=('id', 'created_by_username', 'message', 'is_active', 'is_dismissed', 'created_at', 'tasks'),
+)
+
+EVENTS = Projection(
+    columns={
+        'id': 'id',
+        'actor': 'actor_id',
+        'actor_username': 'actor__username',
+        'from_status': 'from_status',
+        'to_status': 'to_status',
+        'created_at': 'created_at',
+    },
+    default=('id', 'actor_username', 'from_status', 'to_status', 'created_at'),
+)
+
+PROFILES = Projection(
+    columns={
+        'id': 'user_id',
+        'username': 'user__username',
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'is_manager': 'is_manager',
+        'phone_number': 'phone_number',
+    },
+    default=('id', 'username', 'is_manager', 'phone_number'),
+)
+
+
+class ApiMixin:
+    """
+    Session-authenticated JSON endpoints (send the CSRF token with writes).
+    Errors come back as JSON, GET responses always carry an ETag, and
+    bodies are compressed. Use before any other mixin.
+    """
+
+    per_page = 50
+    max_per_page = 200
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response(401, "Authentication required.")
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        except ApiError as exc:
+            response = error_response(exc.status, exc.message, exc.errors)
+        except Http404:
+            response = error_response(404, "Not found.")
+        if request.method == 'GET' and not response.has_header('ETag'):
+            # Content-hash ETag for endpoints without a cheap version.
+            response = ConditionalGetMiddleware(lambda request: response).process_response(request, response)
+        return compress(request, response)
+
+    def read_json(self, allowed):
+        try:
+            data = json.loads(self.request.body or b'{}')
+        except ValueError:
+            raise ApiError(400, "Request body must be JSON.")
+        if not isinstance(data, dict):
+            raise ApiError(400, "Request body must be a JSON object.")
+        unknown = sorted(set(data) - set(allowed))
+        if unknown:
+            raise ApiError(400, f"Unknown field(s): {', '.join(unknown)}.")
+        return data
+
+    def paginate(self, queryset, ordering):
+        try:
+            per_page = min(int(self.request.GET.get('limit', self.per_page)), self.max_per_page)
+        except ValueError:
+            raise ApiError(400, "limit must be a number.")
+        paginator = KeysetPaginator(queryset, max(per_page, 1), ordering=ordering)
+        try:
+            page = paginator.page(after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+        except InvalidCursor:
+            raise ApiError(400, "Invalid cursor.")
+        return page
+
+    def page_response(self, page, results):
+        return JsonResponse({
+            'results': results,
+            'next': page.next_cursor if page.has_next() else None,
+            'previous': page.previous_cursor if page.has_previous() else None,
+        })
+
+
+class TaskListApiView(ApiMixin, ConditionalGetMixin, View):
+    def get(self, request):
+        names = TASKS.fields(request)
+        queryset = ArchivedTask.objects.all() if request.GET.get('archived') in ('1', 'true') else Task.objects.active()
+        queryset = queryset.visible_to(request.user).filtered(request.GET, allow_assignee=request.is_manager)
+
+        ordering = ('-search_rank', '-id') if request.GET.get('search') else ('-updated_at', '-id')
+        if 'search_snippet' in names and not request.GET.get('search'):
+            raise ApiError(400, "search_snippet needs a search.")
+        keys = [name.lstrip('-') for name in ordering]
+        page = self.paginate(queryset.values(*TASKS.lookups(names, extra=keys)), ordering)
+        return self.page_response(page, [TASKS.serialize(row, names) for row in page])
+
+
+class TaskDetailApiView(ApiMixin, ConditionalGetMixin, View):
+    WRITABLE_FIELDS = ('title', 'description', 'status', 'deadline', 'assignee')
+
+    def get_queryset(self):
+        return Task.objects.visible_to(self.request.user)
+
+    def get(self, request, pk):
+        names = [name for name in TASKS.fields(request) if name != 'search_snippet']
+        row = get_object_or_404(self.get_queryset().values(*TASKS.lookups(names)), pk=pk)
+        return JsonResponse(TASKS.serialize(row, names))
+
+    def patch(self, request, pk):
+        task = get_object_or_404(self.get_queryset(), pk=pk)
+        data = self.read_json(self.WRITABLE_FIELDS)
+        original_assignee_id = task.assignee_id
+        # Same validation and role rules as the HTML edit form.
+        form = TaskForm({**model_to_dict(task, fields=self.WRITABLE_FIELDS), **data}, instance=task, user=request.user)
+        if not form.is_valid():
+            raise ApiError(400, "Invalid task.", form.errors)
+        form.save()
+        if original_assignee_id != task.assignee_id:
+            queue_task_assignment_notification(task.id, task.assignee_id)
+        return self.get(request, pk)
+
+
+class TaskBulkApiView(ApiMixin, View):
+    def post(self, request):
+        data = self.read_json(('ids', 'action', 'status', 'assignee'))
+        form = BulkTaskActionForm({
+            'tasks': data.get('ids') or [],
+            'action': data.get('action', 'status'),
+            'status': data.get('status') or '',
+            'assignee': data.get('assignee') or '',
+        }, user=request.user)
+        if not form.is_valid():
+            raise ApiError(400, "Invalid bulk action.", form.errors)
+        return JsonResponse({'updated': form.save()})
+
+
+class TaskEventListApiView(ApiMixin, View):
+    """A task's status history, oldest first; archived tasks keep theirs."""
+
+    def get(self, request, pk):
+        if not any(model.objects.visible_to(request.user).filter(pk=pk).exists() for model in (Task, ArchivedTask)):
+            raise Http404
+        names = EVENTS.fields(request)
+        events = TaskEvent.objects.timeline(pk).values(*EVENTS.lookups(names, extra=['created_at', 'id']))
+        page = self.paginate(events, ('created_at', 'id'))
+        return self.page_response(page, [EVENTS.serialize(row, names) for row in page])
+
+
+class ReminderListApiView(ApiMixin, ConditionalGetMixin, View):
+    def get(self, request):
+        names = REMINDERS.fields(request)
+        # ?sent=1 lists the reminders a manager has sent instead of received.
+        if request.GET.get('sent') in ('1', 'true'):
+            queryset = Reminder.objects.filter(created_by=request.user)
+        else:
+            queryset = Reminder.objects.filter(user=request.user)
+        columns = [name for name in names if name != 'tasks']
+        page = self.paginate(queryset.values(*REMINDERS.lookups(columns, extra=['created_at', 'id'])), ('-created_at', '-id'))
+
+        results = [REMINDERS.serialize(row, columns) for row in page]
+        if 'tasks' in names:
+            task_ids = {row['id']: [] for row in page}
+            links = Reminder.tasks.through.objects.filter(reminder_id__in=task_ids).order_by('task_id')
+            for reminder_id, task_id in links.values_list('reminder_id', 'task_id'):
+                task_ids[reminder_id].append(task_id)
+            for row, result in zip(page, results):
+                result['tasks'] = task_ids[row['id']]
+        return self.page_response(page, results)
+
+
+class ReminderDetailApiView(ApiMixin, View):
+    def patch(self, request, pk):
+        reminder = get_object_or_404(Reminder, pk=pk, user=request.user)
+        data = self.read_json(('is_dismissed',))
+        if not isinstance(data.get('is_dismissed'), bool):
+            raise ApiError(400, "is_dismissed must be true or false.")
+        reminder.is_dismissed = data['is_dismissed']
+        reminder.save(update_fields=['is_dismissed'])
+        return JsonResponse({'id': reminder.id, 'is_dismissed': reminder.is_dismissed})
+
+
+ProfileForm = modelform_factory(Profile, fields=['phone_number'])
+
+
+class ProfileListApiView(ApiMixin, View):
+    def get_queryset(self):
+        queryset = Profile.objects.order_by('user_id')
+        if self.request.is_manager:
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+    def get(self, request):
+        names = PROFILES.fields(request)
+        page = self.paginate(self.get_queryset().values(*PROFILES.lookups(names, extra=['user_id'])), ('user_id',))
+        return self.page_response(page, [PROFILES.serialize(row, names) for row in page])
+
+
+class ProfileDetailApiView(ProfileListApiView):
+    def get(self, request, user_id):
+        names = PROFILES.fields(request)
+        row = get_object_or_404(self.get_queryset().values(*PROFILES.lookups(names)), user_id=user_id)
+        return JsonResponse(PROFILES.serialize(row, names))
+
+    def patch(self, request, user_id):
+        profile = get_object_or_404(self.get_queryset(), user_id=user_id)
+        data = self.read_json(('phone_number',))
+        form = ProfileForm({**model_to_dict(profile, fields=['phone_number']), **data}, instance=profile)
+        if not form.is_valid():
+            raise ApiError(400, "Invalid profile.", form.errors)
+        form.save()
+        return self.get(request, user_id)
+
+
+def describe_upload(session):
+    return {
+        'id': str(session.id),
+        'filename': session.filename,
+        'size': session.size,
+        'offset': session.received,
+        'complete': session.is_complete(),
+    }
+
+
+class UploadSessionApiView(ApiMixin, View):
+    """
+    Starts a resumable upload: POST ``{"filename": ..., "size": ...}``, then
+    PUT the file in order to the returned session with an ``Upload-Offset``
+    header per chunk. The finished session id goes in the task form's
+    ``upload`` field.
+    """
+
+    def post(self, request):
+        data = self.read_json(('filename', 'size'))
+        filename = os.path.basename(str(data.get('filename') or '')).strip()
+        size = data.get('size')
+        if not filename:
+            raise ApiError(400, "filename is required.")
+        if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+            raise ApiError(400, "size must be a positive number of bytes.")
+        if size > settings.UPLOAD_MAX_BYTES:
+            raise ApiError(413, f"Files can be at most {settings.UPLOAD_MAX_BYTES} bytes.")
+        session = UploadSession.objects.create(user=request.user, filename=filename[:255], size=size)
+        return JsonResponse(describe_upload(session), status=201)
+
+
+class UploadChunkApiView(ApiMixin, View):
+    def get(self, request, pk):
+        # Where to resume after a dropped connection.
+        session = get_object_or_404(UploadSession, pk=pk, user=request.user)
+        return JsonResponse(describe_upload(session))
+
+    def put(self, request, pk):
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            raise ApiError(400, "Upload-Offset and Content-Length headers are required.")
+        if length > settings.UPLOAD_CHUNK_MAX_BYTES:
+            raise ApiError(413, f"Chunks can be at most {settings.UPLOAD_CHUNK_MAX_BYTES} bytes.")
+
+        # Only the offset check and the final bookkeeping hold a lock, for a
+        # moment each: reading the body from a slow client and hashing a large
+        # file must not keep every other write in the app waiting.
+        with transaction.atomic():
+            session = get_object_or_404(UploadSession.objects.select_for_update(), pk=pk, user=request.user)
+        if session.is_complete():
+            raise ApiError(409, "Upload already complete.")
+        if offset != session.received:
+            return JsonResponse({'error': "Offset mismatch.", 'offset': session.received}, status=409)
+        if offset + length > session.size:
+            raise ApiError(400, "Chunk goes past the end of the file.")
+
+        os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+        # Written in place at the offset: whatever an interrupted earlier
+        # attempt left past it is overwritten by the chunks that follow.
+        with os.fdopen(os.open(session.part_path, os.O_RDWR | os.O_CREAT, 0o600), 'r+b') as part:
+            part.seek(offset)
+            written = 0
+            while written < length:
+                chunk = request.read(min(UPLOAD_READ_SIZE, length - written))
+                if not chunk:
+                    break
+                part.write(chunk)
+                written += len(chunk)
+
+        received = offset + written
+        digest = file_digest(session.part_path) if received == session.size else None
+        # The offset only moves if no other request for the session got there first.
+        advanced = UploadSession.objects.filter(pk=pk, received=offset).update(
+            received=received, updated_at=timezone.now(),
+        )
+        if not advanced:
+            session.refresh_from_db(fields=['received'])
+            return JsonResponse({'error': "Offset mismatch.", 'offset': session.received}, status=409)
+        session.received = received
+        if digest:
+            session.stored_name = get_task_file_storage().save_path(session.part_path, digest)
+            UploadSession.objects.filter(pk=pk).update(stored_name=session.stored_name)
+        return JsonResponse(describe_upload(session))
+
+    patch = put
@@ -0,0 +1,103 @@
+import io
+import logging
+import zipfile
+from xml.etree import ElementTree
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump to have every stored attachment processed again (see the
+# process_attachments management command).
+PROCESSOR_VERSION = 1
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MAX_XML_BYTES = 50 * 1024 * 1024
+SNIFF_BYTES = 64 * 1024
+THUMBNAIL_SIZE = (320, 320)
+IMAGE_SIGNATURES = (b'\x89PNG\r\n\x1a\n', b'\xff\xd8\xff', b'GIF87a', b'GIF89a')
+
+
+_missing_warned = set()
+
+
+def warn_missing(package, consequence):
+    # Once per process, so a worker's log shows why nothing is extracted.
+    if package not in _missing_warned:
+        _missing_warned.add(package)
+        logger.warning("%s is not installed; %s. See requirements.txt.", package, consequence)
+
+
+def docx_text(file):
+    with zipfile.ZipFile(file) as archive:
+        info = archive.getinfo('word/document.xml')
+        if info.file_size > MAX_XML_BYTES:
+            return ''
+        root = ElementTree.fromstring(archive.read(info))
+    paragraphs = (''.join(node.text or '' for node in paragraph.iter(WORD_NS + 't')) for paragraph in root.iter(WORD_NS + 'p'))
+    return '\n'.join(paragraph for paragraph in paragraphs if paragraph)
+
+
+def pdf_text(file):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        warn_missing('pypdf', "PDF attachments are not searchable")
+        return ''
+    limit = settings.ATTACHMENT_TEXT_MAX_CHARS
+    pages, length = [], 0
+    for page in PdfReader(file).pages:
+        text = page.extract_text() or ''
+        pages.append(text)
+        length += len(text)
+        if length >= limit:
+            break
+    return '\n'.join(pages)
+
+
+def plain_text(head):
+    if b'\x00' in head:
+        return None
+    try:
+        return head.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        if exc.start < len(head) - 3:
+            return None
+        return head[:exc.start].decode('utf-8')  # Cut in the middle of a character
+
+
+def thumbnail(file):
+    try:
+        from PIL import Image
+    except ImportError:
+        warn_missing('Pillow', "image attachments get no preview")
+        return None
+    with Image.open(file) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        output = io.BytesIO()
+        image.convert('RGB').save(output, 'JPEG', quality=80)
+    return output.getvalue()
+
+
+def extract(file):
+    """
+    Searchable text and a JPEG preview (or None) for an attachment. The type
+    is sniffed from the content, since stored files are named by their hash.
+    """
+    head = file.read(SNIFF_BYTES)
+    file.seek(0)
+    text, preview = '', None
+    if head.startswith(b'%PDF-'):
+        text = pdf_text(file)
+    elif head.startswith(b'PK\x03\x04'):
+        try:
+            text = docx_text(file)
+        except (KeyError, zipfile.BadZipFile, ElementTree.ParseError):
+            pass  # Some other kind of zip
+    elif head.startswith(IMAGE_SIGNATURES):
+        preview = thumbnail(file)
+    else:
+        text = plain_text(head) or ''
+        if text and len(head) == SNIFF_BYTES:
+            text += file.read(settings.ATTACHMENT_TEXT_MAX_CHARS).decode('utf-8', 'ignore')
+    return ' '.join(text.split())[:settings.ATTACHMENT_TEXT_MAX_CHARS], preview
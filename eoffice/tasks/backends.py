@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f"tasks:user:{user_id}"
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the session's user from the cache, so warm requests
+    don't query auth_user. Entries are dropped whenever the user is saved,
+    which also covers password changes invalidating other sessions; queryset
+    update()s send no signal, so entries also expire after
+    AUTH_USER_CACHE_SECONDS.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.AUTH_USER_CACHE_SECONDS)
+            return user
+        return user if self.user_can_authenticate(user) else None
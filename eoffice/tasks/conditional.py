@@ -0,0 +1,97 @@
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+CHANGED_AT_KEY = 'tasks:data:changed_at'
+PAGE_KEY_PREFIX = 'tasks:page:'
+
+
+def data_changed_at():
+    """When tasks or reminders last changed, as far as the listing pages are concerned."""
+    changed_at = cache.get(CHANGED_AT_KEY)
+    if changed_at is None:
+        # Unknown (e.g. after a cache flush): assume everything just changed.
+        cache.add(CHANGED_AT_KEY, timezone.now(), None)
+        changed_at = cache.get(CHANGED_AT_KEY) or timezone.now()
+    return changed_at
+
+
+def mark_data_changed(using='default'):
+    # Bumped only after commit, so a page rendered from the old rows is never
+    # stored under the new version.
+    transaction.on_commit(lambda: cache.set(CHANGED_AT_KEY, timezone.now(), None), using=using)
+
+
+def freshness_bucket(now=None):
+    # Deadlines and countdowns age with the clock, so pages also go stale
+    # every DASHBOARD_CACHE_SECONDS even when no row has changed.
+    seconds = settings.DASHBOARD_CACHE_SECONDS
+    timestamp = int((now or timezone.now()).timestamp())
+    return datetime.fromtimestamp(timestamp - timestamp % seconds, tz=dt_timezone.utc)
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified validators for listing pages, so browsers that poll get
+    304s before the view runs a query or renders a template, and a server-side
+    cache of the rendered page under the same version. Use after the
+    access-control mixins.
+    """
+
+    def get_version(self):
+        request = self.request
+        parts = [
+            data_changed_at().isoformat(),
+            freshness_bucket().isoformat(),
+            request.user.pk,
+            bool(request.is_manager),
+            request.get_full_path(),
+            # Rendered forms carry a token derived from the CSRF cookie.
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ]
+        return hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+    def get_etag(self, request, *args, **kwargs):
+        # Pending flash messages are shown (and consumed) by the next render.
+        if len(messages.get_messages(request)):
+            return None
+        return self.get_version()
+
+    def get_last_modified(self, request, *args, **kwargs):
+        if len(messages.get_messages(request)):
+            return None
+        return max(data_changed_at(), freshness_bucket())
+
+    def dispatch(self, request, *args, **kwargs):
+        conditional = condition(etag_func=self.get_etag, last_modified_func=self.get_last_modified)
+        response = conditional(self.render_cached)(request, *args, **kwargs)
+        # Always revalidate; never let the browser reuse a page on its own.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def render_cached(self, request, *args, **kwargs):
+        # Rendered pages are kept under their version, so a request the browser
+        # couldn't answer with a 304 (another tab, a reload) runs no query either.
+        # Without a CSRF cookie the page would carry a token for a new one.
+        if request.method != 'GET' or not request.COOKIES.get(settings.CSRF_COOKIE_NAME):
+            return super().dispatch(request, *args, **kwargs)
+        version = self.get_etag(request)
+        if version is None:
+            return super().dispatch(request, *args, **kwargs)
+        key = f"{PAGE_KEY_PREFIX}{version}"
+        content = cache.get(key)
+        if content is not None:
+            return HttpResponse(content)
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, 'render'):
+            response.render()
+            cache.set(key, response.content, settings.DASHBOARD_CACHE_SECONDS)
+        return response
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+VERSION_KEY = 'tasks:assignees:version'
+DIRECTORY_TIMEOUT = 60 * 60 * 24
+
+
+def _directory_version():
+    cache.add(VERSION_KEY, 1, None)
+    return cache.get(VERSION_KEY, 1)
+
+
+def invalidate_directory():
+    # Bumping the version orphans every cached copy at once; they expire on their own.
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def get_assignee_directory():
+    """Active users as small dicts (id, username, name), sorted by username."""
+    key = f"tasks:assignees:{_directory_version()}"
+    entries = cache.get(key)
+    if entries is None:
+        users = User.objects.filter(is_active=True).order_by('username').values_list(
+            'id', 'username', 'first_name', 'last_name',
+        )
+        entries = [
+            {'id': user_id, 'username': username, 'name': f"{first_name} {last_name}".strip() or username}
+            for user_id, username, first_name, last_name in users
+        ]
+        cache.set(key, entries, DIRECTORY_TIMEOUT)
+    return entries
+
+
+def get_assignee(user_id):
+    for entry in get_assignee_directory():
+        if str(entry['id']) == str(user_id):
+            return entry
+    return None
+
+
+def search_assignees(query, limit=20):
+    query = query.strip().lower()
+    if not query:
+        return get_assignee_directory()[:limit]
+    matches = []
+    for entry in get_assignee_directory():
+        if query in entry['username'].lower() or query in entry['name'].lower():
+            matches.append(entry)
+            if len(matches) == limit:
+                break
+    return matches
@@ -0,0 +1,123 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+READ_SIZE = 64 * 1024
+# Types a browser may show in a tab; anything else (HTML, SVG, ...) could run
+# script on our origin, so it is always downloaded.
+INLINE_TYPES = {'application/pdf', 'image/png', 'image/jpeg', 'image/gif', 'text/plain'}
+
+
+class FileRange:
+    """Reads ``length`` bytes of ``file`` from ``start``, in blocks, for FileResponse."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=READ_SIZE):
+        data = self.file.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """The (start, end) of a single-range ``Range`` header, None to send everything, or ValueError."""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None  # Malformed or multiple ranges: ignore, as RFC 9110 allows
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1  # The last N bytes
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def file_validators(storage, name):
+    # Older task_files/ rows can outlive their file; that is a 404, not a 500.
+    try:
+        if storage.is_content_addressed(name):
+            etag = os.path.basename(name)  # Content never changes under its hash
+        else:
+            stat = os.stat(storage.path(name))
+            etag = f"{int(stat.st_mtime)}-{stat.st_size}"
+        return quote_etag(etag), storage.get_modified_time(name).timestamp()
+    except OSError:
+        raise Http404("File not found.")
+
+
+def serve_file(request, storage, name, filename):
+    """
+    Send a stored file to a client that has already been authorized.
+
+    With TASK_FILE_SENDFILE set, the front server is told to send it
+    (nginx ``X-Accel-Redirect`` under TASK_FILE_ACCEL_PREFIX, or Apache /
+    lighttpd ``X-Sendfile``) and handles ranges itself. Otherwise the file is
+    streamed from here in blocks, honouring ``Range``, ``If-Range`` and the
+    validators.
+    """
+    etag, last_modified = file_validators(storage, name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    as_attachment = 'download' in request.GET or content_type not in INLINE_TYPES
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        backend = settings.TASK_FILE_SENDFILE
+        if backend == 'nginx':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = settings.TASK_FILE_ACCEL_PREFIX + quote(name)
+        elif backend == 'sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = storage.path(name)
+        else:
+            response = stream_file(request, storage, name, etag, content_type)
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['X-Content-Type-Options'] = 'nosniff'
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def stream_file(request, storage, name, etag, content_type):
+    try:
+        size = storage.size(name)
+        file = storage.open(name, 'rb')
+    except OSError:
+        raise Http404("File not found.")
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if 'Range' in request.headers and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except ValueError:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), content_type=content_type, status=206)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+        response['Content-Length'] = end - start + 1
+    response.block_size = READ_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    return response
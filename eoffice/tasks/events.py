@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+MANAGERS_CHANNEL = 'managers'
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def can_stream(request):
+    # Under WSGI an endless stream is drained into a list and never returns,
+    # holding a worker for good; it only works when served over ASGI.
+    return isinstance(request, ASGIRequest)
+
+
+def live_events(request):
+    """Context processor: whether pages should open the event stream."""
+    return {'live_events': can_stream(request)}
+
+
+class InMemoryBroker:
+    """Fan-out within a single process, for tests and single-worker development."""
+
+    def __init__(self):
+        self._queues = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channels, event):
+        with self._lock:
+            targets = {target for channel in channels for target in self._queues.get(channel, ())}
+        for loop, queue in targets:
+            # Publishers run in request or worker threads, subscribers on the event loop.
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def subscribe(self, channels):
+        return InMemorySubscription(self, channels)
+
+
+class InMemorySubscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = list(channels)
+        self.target = (asyncio.get_running_loop(), asyncio.Queue())
+        with broker._lock:
+            for channel in self.channels:
+                broker._queues[channel].add(self.target)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.target[1].get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        with self.broker._lock:
+            for channel in self.channels:
+                self.broker._queues[channel].discard(self.target)
+
+
+class RedisBroker:
+    """Redis pub/sub, so events reach subscribers connected to any worker."""
+
+    prefix = 'tasks:events:'
+
+    def __init__(self):
+        import redis
+
+        self.client = redis.Redis.from_url(settings.TASK_EVENTS_REDIS_URL)
+
+    def publish(self, channels, event):
+        message = json.dumps(event)
+        for channel in channels:
+            self.client.publish(self.prefix + channel, message)
+
+    def subscribe(self, channels):
+        return RedisSubscription(self, channels)
+
+
+class RedisSubscription:
+    def __init__(self, broker, channels):
+        import redis.asyncio
+
+        self.client = redis.asyncio.Redis.from_url(settings.TASK_EVENTS_REDIS_URL)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.channels = [broker.prefix + channel for channel in channels]
+        self.subscribed = False
+
+    async def get(self, timeout):
+        if not self.subscribed:
+            await self.pubsub.subscribe(*self.channels)
+            self.subscribed = True
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.TASK_EVENTS_BROKER)()
+    return _broker
+
+
+def publish(channels, event, using='default'):
+    # Subscribers only ever hear about committed rows.
+    def send():
+        try:
+            get_broker().publish(channels, event)
+        except Exception:
+            # Live updates are best-effort; the pages themselves stay correct.
+            logger.exception("Could not publish %s event", event['type'])
+
+    transaction.on_commit(send, using=using)
+
+
+def publish_task(task, previous_assignee_id=None, using='default'):
+    channels = {MANAGERS_CHANNEL, user_channel(task.assignee_id)}
+    if previous_assignee_id:
+        channels.add(user_channel(previous_assignee_id))
+    publish(channels, {
+        'type': 'task',
+        'id': task.id,
+        'title': task.title,
+        'status': task.status,
+        'status_display': task.get_status_display(),
+        'progress': task.get_progress(),
+        'is_archived': task.is_archived,
+        'assignee_id': task.assignee_id,
+        'previous_assignee_id': previous_assignee_id,
+    }, using)
+
+
+def publish_tasks(task_ids, officer_ids, changes, using='default'):
+    channels = {MANAGERS_CHANNEL} | {user_channel(officer_id) for officer_id in officer_ids}
+    publish(channels, {'type': 'tasks', 'ids': list(task_ids), 'changes': changes}, using)
+
+
+def publish_reminder(officer_id, reminder_id, message, created_by, task_titles, using='default'):
+    publish([user_channel(officer_id)], {
+        'type': 'reminder',
+        'id': reminder_id,
+        'message': message,
+        'created_by': created_by,
+        'tasks': list(task_titles),
+    }, using)
@@ -0,0 +1,160 @@
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .models import Task
+
+CHUNK_SIZE = 2000
+
+COLUMNS = [
+    ('ID', 'id'),
+    ('Title', 'title'),
+    ('Description', 'description'),
+    ('Status', 'status'),
+    ('Assignee', 'assignee__username'),
+    ('Created by', 'created_by__username'),
+    ('Deadline', 'deadline'),
+    ('Created at', 'created_at'),
+    ('Updated at', 'updated_at'),
+    ('Archived', 'is_archived'),
+]
+
+STATUS_LABELS = dict(Task.STATUS_CHOICES)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+INVALID_XML_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def export_rows(queryset):
+    """Header plus one tuple per task, fetched in chunks so memory stays flat."""
+    yield [label for label, _ in COLUMNS]
+    rows = queryset.values_list(*[lookup for _, lookup in COLUMNS]).iterator(chunk_size=CHUNK_SIZE)
+    status_index = [lookup for _, lookup in COLUMNS].index('status')
+    for row in rows:
+        row = list(row)
+        row[status_index] = STATUS_LABELS.get(row[status_index], row[status_index])
+        yield row
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M')
+    return value
+
+
+class Echo:
+    """File-like object whose write() hands the data straight back."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        values = [format_value(value) for value in row]
+        # Keep spreadsheet apps from evaluating cells as formulas.
+        yield writer.writerow([
+            f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+            for value in values
+        ])
+
+
+class ChunkBuffer:
+    """Unseekable sink for ZipFile; the bytes written so far are collected by drain()."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Tasks" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def xlsx_cell(value):
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, int):
+        return f'<c><v>{value}</v></c>'
+    text = escape(INVALID_XML_RE.sub('', str(format_value(value))))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def stream_xlsx(rows, rows_per_flush=500):
+    """
+    A minimal single-sheet workbook written straight into the response: the
+    zip is built on an unseekable buffer, so entries use data descriptors
+    and nothing but the current batch of rows is ever held in memory.
+    """
+    buffer = ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()  # Start the download right away
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            batch = []
+            for row in rows:
+                batch.append('<row>' + ''.join(xlsx_cell(value) for value in row) + '</row>')
+                if len(batch) == rows_per_flush:
+                    sheet.write(''.join(batch).encode())
+                    batch = []
+                    chunk = buffer.drain()
+                    if chunk:  # The compressor may still be holding everything back
+                        yield chunk
+            sheet.write(''.join(batch).encode() + b'</sheetData></worksheet>')
+    yield buffer.drain()
@@ -1,8 +1,33 @@
 from django import forms
-from .models import Task, Profile
+from django.conf import settings
+from .models import Task, Profile, UploadSession
 from django.contrib.auth.models import User
+from .directory import get_assignee
+from .permissions import is_manager
+from .tasks import queue_notification
+
+
+class AssigneeAutocompleteWidget(forms.Widget):
+    # Submits the user id from a hidden input; the visible box only searches
+    # the assignee_autocomplete endpoint, so the user table is never rendered.
+    template_name = 'tasks/widgets/assignee_autocomplete.html'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        entry = get_assignee(value) if value else None
+        context['widget']['label'] = entry['username'] if entry else ''
+        return context
+
+    def id_for_label(self, id_):
+        return f"{id_}_search" if id_ else id_
 
 class TaskForm(forms.ModelForm):
+    # A finished chunked upload (see UploadSessionApiView), used instead of the file input.
+    upload = forms.ModelChoiceField(
+        queryset=UploadSession.objects.none(), required=False,
+        widget=forms.HiddenInput(attrs={'data-chunk-size': settings.UPLOAD_CHUNK_MAX_BYTES}),
+    )
+
     class Meta:
         model = Task
         fields = ['title', 'description', 'status', 'deadline', 'assignee', 'file']
@@ -10,12 +35,13 @@ class TaskForm(forms.ModelForm):
             'deadline': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
             'description': forms.Textarea(attrs={'rows': 4}),
             'file': forms.FileInput(),
+            'assignee': AssigneeAutocompleteWidget(),
         }
 
     def __init__(self, *args, **kwargs):
         user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
-        if user and not (user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager)):
+        if user and not is_manager(user):
             self.fields['status'].choices = [
                 ('dispatched-officer', 'Dispatched to officer'),
                 ('draft', 'Draft'),
@@ -23,8 +49,68 @@ class TaskForm(forms.ModelForm):
                 ('signed-dispatched', 'Signed and dispatched to CD/HM'),
             ]
             self.fields['assignee'].queryset = User.objects.filter(id=user.id)  # Employees can't change assignee
+            self.fields['assignee'].disabled = True
         else:
-            self.fields['assignee'].queryset = User.objects.all()
+            self.fields['assignee'].queryset = User.objects.filter(is_active=True)
+        if user:
+            self.fields['upload'].queryset = UploadSession.objects.filter(user=user).exclude(stored_name='')
+            self.instance.changed_by = user  # Recorded on the status change event
+
+    def save(self, commit=True):
+        upload = self.cleaned_data.get('upload')
+        if upload:
+            self.instance.file = upload.stored_name
+            self.instance.file_name = upload.filename
+        task = super().save(commit)
+        if upload and commit:
+            upload.delete()  # The task now holds the reference to the stored file
+        return task
+
+class BulkTaskActionForm(forms.Form):
+    ACTION_CHOICES = [
+        ('status', 'Change status'),
+        ('archive', 'Archive'),
+        ('reassign', 'Reassign'),
+    ]
+
+    tasks = forms.ModelMultipleChoiceField(queryset=Task.objects.none())
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    status = forms.ChoiceField(choices=[('', 'Choose status')] + Task.STATUS_CHOICES, required=False)
+    assignee = forms.ModelChoiceField(
+        queryset=User.objects.filter(is_active=True), required=False, widget=AssigneeAutocompleteWidget(),
+    )
+
+    def __init__(self, *args, **kwargs):
+        user = self.user = kwargs.pop('user')
+        super().__init__(*args, **kwargs)
+        self.fields['tasks'].queryset = Task.objects.active().visible_to(user)
+        if not is_manager(user):
+            # Employees may only move their own tasks along
+            self.fields['action'].choices = self.ACTION_CHOICES[:1]
+            del self.fields['assignee']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        if action == 'status' and not cleaned_data.get('status'):
+            self.add_error('status', "Choose a status.")
+        if action == 'reassign' and not cleaned_data.get('assignee'):
+            self.add_error('assignee', "Choose an assignee.")
+        return cleaned_data
+
+    def save(self):
+        """Apply the action to the selected tasks and return the ids that changed."""
+        tasks = self.cleaned_data['tasks']
+        action = self.cleaned_data['action']
+        if action == 'status':
+            return tasks.bulk_change(status=self.cleaned_data['status'], changed_by=self.user)
+        if action == 'archive':
+            return tasks.bulk_change(is_archived=True)
+        assignee = self.cleaned_data['assignee']
+        changed = tasks.exclude(assignee=assignee).bulk_change(assignee=assignee)
+        if changed:
+            queue_notification(assignee.id, changed, kind='assignment')
+        return changed
 
 class SignUpForm(forms.ModelForm):
     password = forms.CharField(widget=forms.PasswordInput)
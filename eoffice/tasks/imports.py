@@ -0,0 +1,219 @@
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time
+from functools import lru_cache
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Profile, Task, TaskEvent
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+MAX_REPORTED_ERRORS = 50
+
+
+def read_rows(path):
+    """(line or item number, dict) pairs from a CSV file with a header row, or a JSON list of objects."""
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValidationError(f"{path}: expected a JSON list of objects.")
+        yield from enumerate(data, 1)
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            yield from enumerate(csv.DictReader(f), 2)
+
+
+@lru_cache(maxsize=4096)
+def parse_deadline(value):
+    # Imports tend to repeat a handful of deadlines, so parsing is cached.
+    if not value:
+        return None
+    # A bare date means the end of that day; parse_datetime would read it as midnight.
+    date = parse_date(value)
+    deadline = datetime.combine(date, time(23, 59)) if date else parse_datetime(value)
+    if deadline is None:
+        raise ValidationError(f"invalid deadline {value}")
+    if timezone.is_naive(deadline):
+        deadline = timezone.make_aware(deadline)
+    return deadline
+
+
+def text(row, name):
+    value = row.get(name)
+    return '' if value is None else str(value).strip()
+
+
+def boolean(row, name):
+    value = row.get(name)
+    return value if isinstance(value, bool) else text(row, name).lower() in TRUE_VALUES
+
+
+class BulkImport:
+    """
+    Validates a whole file before writing anything, then inserts it with
+    bulk_create in batches, one transaction per batch. Subclasses check a row
+    in ``clean_row`` and insert a batch of cleaned rows in ``create``.
+    """
+
+    def __init__(self, path, batch_size=5000):
+        self.path = path
+        self.batch_size = batch_size
+
+    def validate(self):
+        """Return (number of rows, list of error messages)."""
+        count, errors = 0, []
+        for number, row in read_rows(self.path):
+            count += 1
+            try:
+                if not isinstance(row, dict):
+                    raise ValidationError("expected an object")
+                self.clean_row(row)
+            except ValidationError as exc:
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(f"{self.path}:{number}: {'; '.join(exc.messages)}")
+                else:
+                    errors[-1] = f"... and more errors in {self.path}"
+        return count, errors
+
+    def save(self, progress=None):
+        self.prepare()
+        count, batch = 0, []
+        for _, row in read_rows(self.path):
+            batch.append(self.clean_row(row))
+            if len(batch) == self.batch_size:
+                count += self.flush(batch, count, progress)
+                batch = []
+        if batch:
+            count += self.flush(batch, count, progress)
+        return count
+
+    def flush(self, batch, done, progress):
+        with transaction.atomic():
+            self.create(batch)
+        if progress:
+            progress(done + len(batch))
+        return len(batch)
+
+    def prepare(self):
+        pass
+
+
+class UserImport(BulkImport):
+    """username, email, first_name, last_name, password, phone_number, is_manager"""
+
+    def __init__(self, path, batch_size=5000):
+        super().__init__(path, batch_size)
+        self.usernames = set()
+
+    def validate(self):
+        count, errors = super().validate()
+        taken = set()
+        usernames = list(self.usernames)
+        for start in range(0, len(usernames), 500):
+            taken.update(User.objects.filter(username__in=usernames[start:start + 500]).values_list('username', flat=True))
+        if taken:
+            errors.append(f"{self.path}: already registered: {', '.join(sorted(taken)[:20])}")
+        return count, errors
+
+    def prepare(self):
+        self.usernames = set()  # Duplicates were found by validate()
+
+    def clean_row(self, row):
+        username = text(row, 'username')
+        email = text(row, 'email')
+        phone_number = text(row, 'phone_number')
+        problems = []
+        if not username or len(username) > 150:
+            problems.append("username is required and at most 150 characters")
+        elif username in self.usernames:
+            problems.append(f"username {username} appears twice")
+        if email:
+            try:
+                validate_email(email)
+            except ValidationError:
+                problems.append(f"invalid email {email}")
+        if len(phone_number) > 15:
+            problems.append("phone_number is at most 15 characters")
+        if problems:
+            raise ValidationError(problems)
+        self.usernames.add(username)
+        user = User(username=username, email=email, first_name=text(row, 'first_name')[:150], last_name=text(row, 'last_name')[:150])
+        return user, text(row, 'password'), Profile(is_manager=boolean(row, 'is_manager'), phone_number=phone_number or None)
+
+    def create(self, batch):
+        # Hashing dominates; PBKDF2 releases the GIL, so spread it over threads.
+        with ThreadPoolExecutor() as pool:
+            hashes = list(pool.map(lambda password: make_password(password or None), [password for _, password, _ in batch]))
+        users = []
+        for (user, _, _), password in zip(batch, hashes):
+            user.password = password  # Blank passwords become unusable
+            users.append(user)
+        User.objects.bulk_create(users)
+        ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id'))
+        # bulk_create skips create_user_profile, so profiles are inserted here in one go.
+        profiles = []
+        for user, _, profile in batch:
+            profile.user_id = ids[user.username]
+            profiles.append(profile)
+        Profile.objects.bulk_create(profiles)
+
+
+class TaskImport(BulkImport):
+    """title, description, status, deadline, assignee, created_by (usernames), is_archived"""
+
+    STATUSES = {value for value, _ in Task.STATUS_CHOICES}
+
+    def __init__(self, path, batch_size=5000):
+        super().__init__(path, batch_size)
+        self.new_usernames = set()
+        self.user_ids = None
+
+    def prepare(self):
+        self.user_ids = dict(User.objects.values_list('username', 'id'))
+
+    def validate(self):
+        self.user_ids = dict(User.objects.values_list('username', 'id'))
+        self.user_ids.update({username: None for username in self.new_usernames})
+        return super().validate()
+
+    def clean_row(self, row):
+        title = text(row, 'title')
+        status = text(row, 'status') or 'dispatched-officer'
+        problems = []
+        if not title or len(title) > 200:
+            problems.append("title is required and at most 200 characters")
+        if status not in self.STATUSES:
+            problems.append(f"unknown status {status}")
+        users = {}
+        for field in ('assignee', 'created_by'):
+            username = text(row, field)
+            if username not in self.user_ids:
+                problems.append(f"{field} {username or '(blank)'} is not a user")
+            users[field] = self.user_ids.get(username)
+        try:
+            deadline = parse_deadline(text(row, 'deadline'))
+        except (ValidationError, ValueError) as exc:
+            problems.append(str(exc.messages[0] if isinstance(exc, ValidationError) else exc))
+            deadline = None
+        if problems:
+            raise ValidationError(problems)
+        return {
+            'title': title, 'description': text(row, 'description'), 'status': status, 'deadline': deadline,
+            'assignee_id': users['assignee'], 'created_by_id': users['created_by'],
+            'is_archived': boolean(row, 'is_archived'),
+        }
+
+    def create(self, batch):
+        tasks = Task.objects.bulk_create([Task(**values) for values in batch])
+        # bulk_create skips the post_save handler that records creation.
+        TaskEvent.objects.bulk_create([
+            TaskEvent(task_id=task.pk, actor_id=task.created_by_id, to_status=task.status) for task in tasks
+        ])
@@ -0,0 +1,160 @@
+import itertools
+import json
+import math
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from tasks.models import OPEN_STATUSES, ArchivedTask, Reminder, Task
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the dashboards and write paths through the full middleware stack and print p50/p95 latency "
+        "and query counts as JSON. Seed data with seed_benchmark_data first. Writes are committed, with "
+        "their on_commit work, as in production, so run this against a throwaway copy of the database "
+        "(e.g. DB_NAME=/tmp/bench.sqlite3) with a celery broker running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3, help="Untimed runs per scenario.")
+        parser.add_argument('--warm', action='store_true', help="Keep caches between runs instead of clearing them.")
+        parser.add_argument('--manager', help="Username to browse as manager (default: any manager).")
+        parser.add_argument('--officer', help="Username to browse as officer (default: the officer with most open tasks).")
+        parser.add_argument('--host', default='localhost', help="Host header; must be in ALLOWED_HOSTS.")
+        parser.add_argument('--only', action='append', help="Run just this scenario; may be repeated.")
+        parser.add_argument('--output', help="Write the JSON here instead of stdout.")
+        parser.add_argument('--compare', help="Earlier JSON output to print p95 changes against.")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        if options['warmup'] < 0:
+            raise CommandError("--warmup can't be negative.")
+        manager, officer = self.get_users(options)
+        self.clients = {}
+        for user in (manager, officer):
+            client = Client(HTTP_HOST=options['host'])
+            client.force_login(user)
+            self.clients[user.pk] = client
+
+        try:
+            scenarios = self.get_scenarios(manager, officer)
+        except Task.DoesNotExist:
+            raise CommandError(f"{officer.username} has no open tasks to update.")
+        if options['only']:
+            unknown = set(options['only']) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}.")
+            scenarios = {name: scenarios[name] for name in options['only']}
+
+        results = {
+            name: self.measure(name, run, options['iterations'], options['warmup'], options['warm'])
+            for name, run in scenarios.items()
+        }
+        report = {
+            'recorded_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'warm_cache': options['warm'],
+            'dataset': {
+                'users': User.objects.count(),
+                'active_tasks': Task.objects.active().count(),
+                'archived_tasks': ArchivedTask.objects.count(),
+                'reminders': Reminder.objects.count(),
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def get_users(self, options):
+        managers = User.objects.filter(profile__is_manager=True)
+        officers = User.objects.filter(profile__is_manager=False, is_superuser=False)
+        try:
+            manager = managers.get(username=options['manager']) if options['manager'] else managers.earliest('id')
+            if options['officer']:
+                officer = officers.get(username=options['officer'])
+            else:
+                officer_id = (
+                    Task.objects.active().filter(assignee__in=officers, status__in=OPEN_STATUSES)
+                    .values('assignee').order_by().annotate(open=Count('id')).order_by('-open')
+                    .values_list('assignee', flat=True)[:1].get()
+                )
+                officer = User.objects.get(pk=officer_id)
+        except (User.DoesNotExist, Task.DoesNotExist):
+            raise CommandError("Need a manager and an officer with open tasks; run seed_benchmark_data first.")
+        return manager, officer
+
+    def get_scenarios(self, manager, officer):
+        as_manager, as_officer = self.clients[manager.pk], self.clients[officer.pk]
+        open_task_id = Task.objects.active().filter(assignee=officer, status__in=OPEN_STATUSES).values_list('id', flat=True)[:1].get()
+        overdue_ids = list(Task.objects.overdue().filter(assignee=officer).values_list('id', flat=True)[:20])
+        statuses = itertools.cycle(['finalized-draft', 'draft'])
+        return {
+            'task_list': lambda: as_manager.get(reverse('task_list')),
+            'manager_dashboard': lambda: as_manager.get(reverse('manager_dashboard')),
+            'employee_dashboard': lambda: as_officer.get(reverse('employee_dashboard')),
+            'archived_dashboard': lambda: as_manager.get(reverse('archived_dashboard')),
+            # Alternates, so every run really changes the status.
+            'task_direct_status_update': lambda: as_officer.post(
+                reverse('task_direct_status_update', args=[open_task_id, next(statuses)])
+            ),
+            'send_reminder': lambda: as_manager.post(
+                reverse('send_reminder', args=[officer.pk]), {'tasks': overdue_ids, 'message': 'Benchmark'}
+            ),
+        }
+
+    def measure(self, name, run, iterations, warmup, warm):
+        timings, queries = [], []
+        for iteration in range(warmup + iterations):
+            if not warm:
+                cache.clear()
+            start = time.perf_counter()
+            response = run()
+            elapsed = time.perf_counter() - start
+            if response.status_code >= 400:
+                raise CommandError(f"{name} returned {response.status_code}.")
+            if iteration >= warmup:
+                timings.append(elapsed * 1000)
+                queries.append(response.metrics.queries)  # From MetricsMiddleware
+        self.stderr.write(f"{name}: p50 {percentile(timings, 50):.1f} ms, p95 {percentile(timings, 95):.1f} ms")
+        return {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': max(queries),
+        }
+
+    def compare(self, path, results):
+        with open(path) as f:
+            previous = json.load(f)['results']
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before, after = previous[name]['p95_ms'], result['p95_ms']
+            change = (after - before) / before * 100 if before else 0
+            self.stderr.write(
+                f"{name}: p95 {before:.1f} -> {after:.1f} ms ({change:+.0f}%), "
+                f"queries {previous[name]['queries']} -> {result['queries']}"
+            )
@@ -0,0 +1,85 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+SOURCE_ALIAS = 'copy_source'
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy every row from a SQLite database file (by default db.sqlite3) into the configured "
+        "database, e.g. a freshly migrated Postgres, in bulk batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=str(settings.BASE_DIR / 'db.sqlite3'), help="SQLite file to read.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Database alias to write to.")
+        parser.add_argument('--batch-size', type=int, default=2000, help="Rows read and inserted per batch.")
+
+    def handle(self, *args, source, database, batch_size, **options):
+        connections.settings[SOURCE_ALIAS] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: {},  # Only there to satisfy the check for a default
+            SOURCE_ALIAS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': source},
+        })[SOURCE_ALIAS]
+        try:
+            self.check_migrated(SOURCE_ALIAS, "Run `manage.py migrate` against the SQLite file first.")
+            self.check_migrated(database, f"Run `manage.py migrate --database {database}` first.")
+            models = [
+                model for model in apps.get_models(include_auto_created=True)
+                if model._meta.managed and not model._meta.proxy
+            ]
+            with transaction.atomic(using=database):
+                self.clear(database, models)
+                for model in models:
+                    self.copy(model, database, batch_size)
+                self.reset_sequences(database, models)
+        finally:
+            connections[SOURCE_ALIAS].close()
+            del connections[SOURCE_ALIAS]
+            del connections.settings[SOURCE_ALIAS]
+
+    def check_migrated(self, alias, hint):
+        executor = MigrationExecutor(connections[alias])
+        if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+            raise CommandError(f"Database '{alias}' has unapplied migrations. {hint}")
+
+    def clear(self, database, models):
+        # migrate fills in content types, permissions and the like on its own,
+        # under different ids; everything else must start out empty.
+        seeded = {'contenttypes.contenttype', 'auth.permission'}
+        for model in models:
+            if model._meta.label_lower in seeded:
+                continue
+            if model._base_manager.using(database).exists():
+                raise CommandError(f"{model._meta.label} already has rows in '{database}'; copy into an empty database.")
+        for label in seeded:
+            apps.get_model(label)._base_manager.using(database).all().delete()
+
+    def copy(self, model, database, batch_size):
+        # Foreign keys are checked at commit, so tables can go in any order;
+        # bulk_create sends no signals, so nothing is derived or notified twice.
+        fields = [field.attname for field in model._meta.concrete_fields]
+        rows = model._base_manager.using(SOURCE_ALIAS).order_by('pk').values_list(*fields).iterator(chunk_size=batch_size)
+        manager = model._base_manager.using(database)
+        batch, count = [], 0
+        for row in rows:
+            batch.append(model(**dict(zip(fields, row))))
+            if len(batch) == batch_size:
+                manager.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            manager.bulk_create(batch)
+            count += len(batch)
+        if count:
+            self.stdout.write(f"{model._meta.label}: {count} row(s)")
+
+    def reset_sequences(self, database, models):
+        connection = connections[database]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Min
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from tasks.models import ArchivedTask, OverdueSummary, Task, Reminder, OPEN_STATUSES
+from tasks.pagination import KeysetPaginator
+
+
+class Command(BaseCommand):
+    help = "Print the database query plan for each dashboard query, to verify index usage."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--officer', help="Username used for the per-officer queries (default: any non-manager).")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Database alias to explain against.")
+        parser.add_argument('--analyze', action='store_true', help="Run EXPLAIN ANALYZE (PostgreSQL only).")
+
+    def get_queries(self, officer_id, now):
+        page_size = 50
+        listing = Task.objects.for_listing()
+        archive = ArchivedTask.objects.for_listing()
+        paginator = KeysetPaginator(listing, page_size)
+        seek = paginator.seek([now, 0], forward=True)
+        return [
+            ("task_list / manager_dashboard: first page",
+             listing.active().order_by('-updated_at', '-id')[:page_size + 1]),
+            ("task_list / manager_dashboard: later page",
+             listing.active().filter(seek).order_by('-updated_at', '-id')[:page_size + 1]),
+            ("manager_dashboard: status filter",
+             listing.active().filter(status='draft').order_by('-updated_at', '-id')[:page_size + 1]),
+            ("employee_dashboard / task_list: officer",
+             listing.active().filter(assignee_id=officer_id).order_by('-updated_at', '-id')[:page_size + 1]),
+            ("employee_dashboard: officer + status filter",
+             listing.active().filter(assignee_id=officer_id, status='draft').order_by('-updated_at', '-id')[:page_size + 1]),
+            ("task_list: search",
+             listing.active().search('budget memo').order_by('-search_rank', '-id')[:page_size + 1]),
+            ("manager_dashboard: overdue officers",
+             OverdueSummary.objects.select_related('officer').only(
+                 'overdue_count', 'oldest_deadline', 'tasks', 'officer__id', 'officer__username',
+             ).order_by('oldest_deadline')),
+            ("refresh_overdue_summaries: overdue totals",
+             Task.objects.overdue(now).values('assignee_id').annotate(count=Count('id'), oldest=Min('deadline')).order_by()),
+            ("scan_overdue_tasks: tasks to remind",
+             Reminder.objects.tasks_to_remind(now - timedelta(minutes=1), now).values_list(
+                 'id', 'title', 'assignee_id', 'created_by_id', 'created_by__username',
+             )),
+            ("scan_overdue_tasks: open reminders",
+             Reminder.objects.filter(user_id__in=[officer_id], is_active=True, is_dismissed=False).order_by('created_at', 'id')),
+            ("send_reminder: officer overdue tasks",
+             Task.objects.overdue(now).filter(assignee_id=officer_id).only('id', 'title', 'deadline')),
+            ("employee_dashboard: pending reminders",
+             Reminder.objects.filter(
+                 user_id=officer_id, is_active=True, is_dismissed=False,
+                 tasks__is_archived=False, tasks__deadline__lt=now, tasks__status__in=OPEN_STATUSES,
+             ).distinct()),
+            ("archived_dashboard: first page",
+             archive.order_by('-updated_at', '-id')[:page_size + 1]),
+            ("archived_dashboard: officer",
+             archive.filter(assignee_id=officer_id).order_by('-updated_at', '-id')[:page_size + 1]),
+        ]
+
+    def handle(self, *args, **options):
+        database = options['database']
+        users = User.objects.using(database)
+        if options['officer']:
+            officer_id = users.filter(username=options['officer']).values_list('id', flat=True).first()
+            if officer_id is None:
+                raise CommandError(f"No user named {options['officer']!r}.")
+        else:
+            officer_id = users.filter(is_superuser=False, profile__is_manager=False).values_list('id', flat=True).first() or 0
+
+        explain_options = {}
+        if options['analyze']:
+            if connections[database].vendor != 'postgresql':
+                self.stderr.write("--analyze is only supported on PostgreSQL; ignoring.")
+            else:
+                explain_options['analyze'] = True
+
+        for label, queryset in self.get_queries(officer_id, timezone.now()):
+            queryset = queryset.using(database)
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            if options['verbosity'] > 1:
+                self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
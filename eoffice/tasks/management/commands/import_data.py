@@ -0,0 +1,70 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.conditional import mark_data_changed
+from tasks.directory import invalidate_directory
+from tasks.imports import TaskImport, UserImport
+from tasks.models import OverdueSummary
+from tasks.tasks import move_archived_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "Import officers and tasks from CSV (with a header row) or JSON (a list of objects). Every row is "
+        "validated before anything is written; rows are then inserted with bulk_create, one transaction per "
+        "batch, without notifications. User columns: username, email, first_name, last_name, password, "
+        "phone_number, is_manager. Task columns: title, description, status, deadline, assignee, created_by, "
+        "is_archived (assignee and created_by are usernames)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', help="File of users to create.")
+        parser.add_argument('--tasks', help="File of tasks to create.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows inserted per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate the files.")
+
+    def handle(self, *args, **options):
+        if not options['users'] and not options['tasks']:
+            raise CommandError("Give --users, --tasks or both.")
+        imports = []
+        if options['users']:
+            imports.append(('users', UserImport(options['users'], options['batch_size'])))
+        if options['tasks']:
+            imports.append(('tasks', TaskImport(options['tasks'], options['batch_size'])))
+
+        totals, errors = {}, []
+        for label, importer in imports:
+            try:
+                totals[label], file_errors = importer.validate()
+            except (OSError, ValueError, ValidationError) as exc:
+                raise CommandError(f"Can't read {importer.path}: {exc}")
+            if label == 'users' and len(imports) == 2:
+                imports[1][1].new_usernames = importer.usernames  # Tasks may go to users created here
+            errors += file_errors
+        if errors:
+            for error in errors:
+                self.stderr.write(error)
+            raise CommandError("Nothing was imported; fix the rows above and try again.")
+        summary = ', '.join(f"{count} {label}" for label, count in totals.items())
+        if options['dry_run']:
+            self.stdout.write(f"Valid: {summary}. Nothing was imported (dry run).")
+            return
+
+        for label, importer in imports:
+            start = time.perf_counter()
+
+            def progress(done, label=label, start=start):
+                rate = done / max(time.perf_counter() - start, 1e-6)
+                self.stdout.write(f"{label}: {done}/{totals[label]} ({rate:.0f} rows/s)")
+
+            importer.save(progress)
+        archived = move_archived_tasks(options['batch_size'])
+        if archived:
+            self.stdout.write(f"Moved {archived} archived task(s) into the archive.")
+        # bulk_create bypasses the signals that keep these up to date.
+        OverdueSummary.objects.refresh()
+        invalidate_directory()
+        mark_data_changed()
+        self.stdout.write(self.style.SUCCESS(f"Imported {summary}."))
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.tasks import move_archived_tasks
+
+
+class Command(BaseCommand):
+    help = "Move archived tasks out of the live table into the archive, e.g. to backfill after upgrading."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_MOVE_BATCH_SIZE)
+        parser.add_argument('--sync', action='store_true', help="Move them here instead of queueing for the workers.")
+
+    def handle(self, *args, batch_size, sync=False, **options):
+        if sync:
+            self.stdout.write(f"Moved {move_archived_tasks(batch_size)} archived task(s).")
+        else:
+            move_archived_tasks.delay(batch_size)
+            self.stdout.write("Queued the move of archived tasks.")
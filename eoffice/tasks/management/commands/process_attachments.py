@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from tasks.attachments import PROCESSOR_VERSION
+from tasks.models import Blob
+from tasks.tasks import process_attachment
+
+
+class Command(BaseCommand):
+    help = "Queue text extraction and previews for stored attachments that haven't been processed yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Process every attachment again.")
+        parser.add_argument('--sync', action='store_true', help="Process here instead of queueing for the workers.")
+
+    def handle(self, *args, force=False, sync=False, **options):
+        blobs = Blob.objects.all() if force else Blob.objects.exclude(processed_version=PROCESSOR_VERSION)
+        count = 0
+        for blob_id in blobs.values_list('id', flat=True).iterator():
+            if sync:
+                process_attachment(blob_id, force=force)
+            else:
+                process_attachment.delay(blob_id, force=force)
+            count += 1
+        self.stdout.write(f"{'Processed' if sync else 'Queued'} {count} attachment(s).")
@@ -0,0 +1,164 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from tasks.directory import invalidate_directory
+from tasks.models import OPEN_STATUSES, ArchivedTask, Blob, OverdueSummary, Profile, Reminder, Task, TaskEvent
+from tasks.conditional import mark_data_changed
+from tasks.storage import get_task_file_storage
+from tasks.tasks import move_archived_tasks
+
+USERNAME_PREFIX = 'bench-'
+WORDS = (
+    'budget memo procurement leave request audit circular minutes draft policy tender payroll '
+    'inspection report letter approval transfer training schedule vendor contract review'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed realistic volumes of officers, tasks in every status with their status history, archived "
+        "history, reminders, attachments and the overdue rollup with bulk_create, for benchmark_views. "
+        "Seeded users are named bench-*."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--officers', type=int, default=50)
+        parser.add_argument('--managers', type=int, default=3)
+        parser.add_argument('--tasks', type=int, default=10000, help="Active tasks.")
+        parser.add_argument('--archived', type=int, default=20000, help="Archived tasks.")
+        parser.add_argument('--attachments', type=int, default=200, help="Distinct attachment files.")
+        parser.add_argument('--attached-ratio', type=float, default=0.2, help="Share of tasks with an attachment.")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed, so runs are comparable.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--clear', action='store_true', help="Delete earlier bench-* users and their tasks first.")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        with transaction.atomic():
+            if options['clear']:
+                self.clear()
+            managers = self.create_users('manager', options['managers'], is_manager=True)
+            officers = self.create_users('officer', options['officers'], is_manager=False)
+            files = self.create_files(options['attachments'])
+            self.create_tasks(options['tasks'], False, managers, officers, files, options['attached_ratio'])
+            self.create_tasks(options['archived'], True, managers, officers, files, options['attached_ratio'])
+            move_archived_tasks(self.batch_size)  # Into ArchivedTask, where the archive is read from
+            reminders = self.create_reminders(managers)
+            OverdueSummary.objects.refresh()
+            invalidate_directory()
+            mark_data_changed()
+        self.stdout.write(
+            f"Seeded {len(managers)} managers, {len(officers)} officers, {options['tasks']} active and "
+            f"{options['archived']} archived tasks, {len(files)} attachments, {reminders} reminders."
+        )
+
+    def clear(self):
+        # Cascades through the regular delete signals, so attachment references are released.
+        # Status history refers to tasks by id only, so it goes first.
+        users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        for model in (Task, ArchivedTask):
+            TaskEvent.objects.filter(task_id__in=model.objects.filter(assignee__in=users).values('id')).delete()
+        count, _ = users.delete()
+        self.stdout.write(f"Deleted {count} earlier benchmark rows.")
+
+    def create_users(self, role, count, is_manager):
+        password = make_password('password')  # Hashing once keeps seeding fast
+        start = User.objects.filter(username__startswith=f"{USERNAME_PREFIX}{role}").count()
+        users = User.objects.bulk_create([
+            User(username=f"{USERNAME_PREFIX}{role}-{start + index:04d}", password=password,
+                 first_name=role.title(), last_name=f"{start + index:04d}")
+            for index in range(count)
+        ], batch_size=self.batch_size)
+        users = list(User.objects.filter(username__in=[user.username for user in users]))
+        # bulk_create skips the post_save signal that normally adds the profile.
+        Profile.objects.bulk_create([
+            Profile(user=user, is_manager=is_manager, phone_number='+1234567890') for user in users
+        ], batch_size=self.batch_size)
+        return users
+
+    def create_files(self, count):
+        storage = get_task_file_storage()
+        files = []
+        for index in range(count):
+            text = ' '.join(self.random.choices(WORDS, k=200))
+            name = storage.save('seed.txt', ContentFile(f"Attachment {index}\n{text}".encode()))
+            files.append((name, f"attachment-{index:04d}.txt"))
+        return files
+
+    def sentence(self, words):
+        return ' '.join(self.random.choices(WORDS, k=words)).capitalize()
+
+    def create_tasks(self, count, is_archived, managers, officers, files, attached_ratio):
+        statuses = [status for status, _ in Task.STATUS_CHOICES]
+        references = {}
+        batch = []
+        for index in range(count):
+            task = Task(
+                title=self.sentence(4),
+                description=self.sentence(30),
+                status='signed-dispatched' if is_archived and self.random.random() < 0.8 else self.random.choice(statuses),
+                deadline=self.now + timedelta(hours=self.random.randint(-24 * 60, 24 * 30)),
+                assignee=self.random.choice(officers),
+                created_by=self.random.choice(managers),
+                is_archived=is_archived,
+            )
+            if files and self.random.random() < attached_ratio:
+                name, task.file_name = self.random.choice(files)
+                task.file = name
+                references[name] = references.get(name, 0) + 1
+            batch.append(task)
+            if len(batch) == self.batch_size:
+                self.add_events(Task.objects.bulk_create(batch), statuses)
+                batch = []
+        self.add_events(Task.objects.bulk_create(batch), statuses)
+        self.add_references(references)
+
+    def add_events(self, tasks, statuses):
+        # The status history each task would have built up on its way to its
+        # current status, one step a day or so.
+        events = []
+        for task in tasks:
+            steps = statuses[:statuses.index(task.status) + 1]
+            changed_at = self.now - timedelta(hours=self.random.randint(1, 24 * 60))
+            for previous, status in zip([''] + steps, steps):
+                events.append(TaskEvent(
+                    task_id=task.id, actor_id=task.created_by_id if not previous else task.assignee_id,
+                    from_status=previous, to_status=status, created_at=changed_at,
+                ))
+                changed_at += timedelta(hours=self.random.randint(1, 48))
+        TaskEvent.objects.bulk_create(events, batch_size=self.batch_size)
+
+    def add_references(self, references):
+        storage = get_task_file_storage()
+        for name, count in references.items():
+            blob, created = Blob.objects.get_or_create(name=name, defaults={'size': storage.size(name), 'refcount': count})
+            if not created:
+                Blob.objects.filter(pk=blob.pk).update(refcount=blob.refcount + count)
+
+    def create_reminders(self, managers):
+        # One open reminder per officer covering their overdue tasks, like send_reminder does.
+        overdue = Task.objects.filter(
+            assignee__username__startswith=USERNAME_PREFIX, is_archived=False,
+            deadline__lt=self.now, status__in=OPEN_STATUSES,
+        ).values_list('assignee_id', 'id')
+        by_officer = {}
+        for officer_id, task_id in overdue.iterator(chunk_size=self.batch_size):
+            by_officer.setdefault(officer_id, []).append(task_id)
+        reminders = Reminder.objects.bulk_create([
+            Reminder(user_id=officer_id, created_by=self.random.choice(managers), message='Please update these tasks.')
+            for officer_id in by_officer
+        ], batch_size=self.batch_size)
+        Reminder.tasks.through.objects.bulk_create([
+            Reminder.tasks.through(reminder_id=reminder.id, task_id=task_id)
+            for reminder in reminders for task_id in by_officer[reminder.user_id]
+        ], batch_size=self.batch_size)
+        return len(reminders)
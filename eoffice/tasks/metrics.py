@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_RECORDED_QUERIES = 50
+
+
+class RequestMetrics:
+    """What one request cost. Also installed as a database execute wrapper to count queries."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.duration = 0.0
+        self.sql = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            if len(self.sql) < MAX_RECORDED_QUERIES:
+                self.sql.append((elapsed, sql))
+
+
+class ViewStats:
+    def __init__(self):
+        self.responses = defaultdict(int)  # (method, status) -> count
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+
+
+class MetricsRegistry:
+    """Per-process totals by URL name, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = defaultdict(ViewStats)
+
+    def record(self, view, method, status, metrics):
+        with self.lock:
+            stats = self.views[view]
+            stats.responses[(method, status)] += 1
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if metrics.duration <= bound:
+                    stats.buckets[index] += 1
+            stats.count += 1
+            stats.duration += metrics.duration
+            stats.queries += metrics.queries
+            stats.db_time += metrics.db_time
+            stats.render_time += metrics.render_time
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+
+    def render(self):
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = [
+                '# HELP eoffice_requests_total Requests handled, by URL name.',
+                '# TYPE eoffice_requests_total counter',
+            ]
+            for view, stats in views:
+                for (method, status), count in sorted(stats.responses.items()):
+                    lines.append(f'eoffice_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP eoffice_request_duration_seconds Time to produce the response.',
+                '# TYPE eoffice_request_duration_seconds histogram',
+            ]
+            for view, stats in views:
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    lines.append(f'eoffice_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+                lines.append(f'eoffice_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {stats.count}')
+                lines.append(f'eoffice_request_duration_seconds_sum{{view="{view}"}} {stats.duration:.6f}')
+                lines.append(f'eoffice_request_duration_seconds_count{{view="{view}"}} {stats.count}')
+
+            for name, attribute, help_text in (
+                ('eoffice_request_db_queries_total', 'queries', 'Database queries run.'),
+                ('eoffice_request_db_seconds_total', 'db_time', 'Time spent in the database.'),
+                ('eoffice_request_render_seconds_total', 'render_time', 'Time spent rendering templates.'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for view, stats in views:
+                    value = getattr(stats, attribute)
+                    lines.append(f'{name}{{view="{view}"}} {value if isinstance(value, int) else f"{value:.6f}"}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    Record query count, database time, template render time and latency for
+    every request under its URL name, log slow or over-budget requests
+    (QUERY_BUDGETS) with their SQL, and leave the numbers on
+    ``response.metrics`` for tests. Put it first, so template responses are
+    rendered, and timed, here.
+
+    Queries of async views run in worker threads and aren't counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = request.metrics = RequestMetrics()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = self.get_response(request)
+        return self.finish(request, response, start)
+
+    async def __acall__(self, request):
+        request.metrics = RequestMetrics()
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.finish(request, response, start)
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+        response.render()
+        request.metrics.render_time += time.perf_counter() - start
+        return response
+
+    def finish(self, request, response, start):
+        metrics = request.metrics
+        metrics.duration = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry.record(view, request.method, response.status_code, metrics)
+        response.metrics = metrics
+
+        budget = settings.QUERY_BUDGETS.get(view)
+        over_budget = budget is not None and metrics.queries > budget
+        if over_budget or metrics.duration * 1000 >= settings.SLOW_REQUEST_MS:
+            statements = '\n'.join(
+                f"  {elapsed * 1000:7.1f} ms  {sql}" for elapsed, sql in sorted(metrics.sql, reverse=True)
+            )
+            logger.warning(
+                "%s %s (%s): %.0f ms, %d queries (budget %s) in %.0f ms, rendering %.0f ms\n%s",
+                request.method, request.get_full_path(), view, metrics.duration * 1000, metrics.queries,
+                budget if budget is not None else '-', metrics.db_time * 1000, metrics.render_time * 1000,
+                statements,
+            )
+        return response
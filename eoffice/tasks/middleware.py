@@ -0,0 +1,27 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from .permissions import is_manager
+
+
+class RoleMiddleware:
+    """Expose ``request.is_manager``, resolved lazily on first use."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.is_manager = SimpleLazyObject(lambda: is_manager(request.user))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Async views must not touch this lazily; see TaskEventStreamView.
+        request.is_manager = SimpleLazyObject(lambda: is_manager(request.user))
+        return await self.get_response(request)
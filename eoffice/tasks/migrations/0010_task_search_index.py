@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from tasks.search import get_search_backend
+    get_search_backend(schema_editor.connection.alias).install(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from tasks.search import get_search_backend
+    get_search_backend(schema_editor.connection.alias).uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_dashboard_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
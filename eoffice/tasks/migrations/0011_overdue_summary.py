@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_task_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverdueSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('overdue_count', models.PositiveIntegerField(default=0)),
+                ('oldest_deadline', models.DateTimeField()),
+                ('tasks', models.JSONField(default=list)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('officer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='overdue_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:51
+
+from django.db import migrations, models
+
+
+def reinstall_search_index(apps, schema_editor):
+    # The index now covers attachment_text as well.
+    from tasks.search import get_search_backend
+    backend = get_search_backend(schema_editor.connection.alias)
+    backend.uninstall(schema_editor.connection)
+    backend.install(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from tasks.search import get_search_backend
+    get_search_backend(schema_editor.connection.alias).uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_task_file_storage_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='preview',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='blob',
+            name='processed_version',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='blob',
+            name='text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='attachment_text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(reinstall_search_index, uninstall_search_index),
+    ]
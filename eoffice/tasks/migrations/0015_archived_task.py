@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:09
+
+import django.db.models.deletion
+import tasks.storage
+from django.conf import settings
+from django.db import migrations, models
+
+
+def install_search_index(apps, schema_editor):
+    # Adds the index for the new table; the live table's is left as it is.
+    from tasks.search import get_search_backend
+    get_search_backend(schema_editor.connection.alias).install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0014_attachment_processing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('dispatched-officer', 'Dispatched to officer'), ('draft', 'Draft'), ('finalized-draft', 'Finalized draft'), ('signed-dispatched', 'Signed and dispatched to CD/HM')], max_length=50)),
+                ('deadline', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('file', models.FileField(blank=True, null=True, storage=tasks.storage.get_task_file_storage, upload_to='task_files/')),
+                ('file_name', models.CharField(blank=True, max_length=255)),
+                ('attachment_text', models.TextField(blank=True)),
+                ('assignee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='created_archived_tasks', to=settings.AUTH_USER_MODEL)),
+                ('reminders', models.ManyToManyField(related_name='archived_tasks', to='tasks.reminder')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-updated_at', '-id'], name='archivedtask_recent_idx'), models.Index(fields=['assignee', '-updated_at', '-id'], name='archivedtask_assignee_idx')],
+            },
+        ),
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
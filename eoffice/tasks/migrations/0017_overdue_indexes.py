@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0016_task_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reminder',
+            name='reminder_user_state_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_overdue_deadline_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['deadline'], name='task_active_deadline_idx'),
+        ),
+    ]
@@ -1,6 +1,117 @@
-from django.db import models
+import os
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+
+from django.db import models, router, transaction
+from django.db.models import Count, F, Min, Prefetch, Q, Value, Window
+from django.db.models.functions import RowNumber
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .conditional import mark_data_changed
+from .events import publish_reminder, publish_tasks
+from .storage import get_task_file_storage
+
+OPEN_STATUSES = ['dispatched-officer', 'draft', 'finalized-draft']
+
+
+class ListingQuerySet(models.QuerySet):
+    """Filtering shared by live and archived tasks, which have the same listing columns."""
+
+    # Columns rendered by the task tables; everything else stays deferred.
+    LISTING_FIELDS = (
+        'id', 'title', 'description', 'status', 'deadline', 'file', 'updated_at',
+        'assignee', 'assignee__username',
+    )
+
+    def visible_to(self, user):
+        from .permissions import is_manager
+        if is_manager(user):
+            return self
+        return self.filter(assignee=user)
+
+    def filtered(self, params, allow_assignee=True):
+        queryset = self
+        status = params.get('status')
+        assignee = params.get('assignee')
+        search = params.get('search')
+
+        if status:
+            queryset = queryset.filter(status=status)
+        if assignee and allow_assignee:
+            queryset = queryset.filter(assignee__username=assignee)
+        if search:
+            queryset = queryset.search(search)
+        return queryset
+
+    def search(self, query):
+        # Annotates search_rank (higher is better) and search_snippet.
+        from .search import get_search_backend
+        return get_search_backend(self.db).search(self, query)
+
+    def for_listing(self):
+        return self.select_related('assignee').only(*self.LISTING_FIELDS)
+
+
+class TaskQuerySet(ListingQuerySet):
+    LISTING_FIELDS = ListingQuerySet.LISTING_FIELDS + ('is_archived',)
+
+    def active(self):
+        return self.filter(is_archived=False)
+
+    def archived(self):
+        # Archived tasks only stay here until they are moved to ArchivedTask,
+        # by bulk_change straight away or later by move_archived_tasks;
+        # listings of the archive read from there.
+        return self.filter(is_archived=True)
+
+    def overdue(self, now=None):
+        return self.active().filter(deadline__lt=now or timezone.now(), status__in=OPEN_STATUSES)
+
+    def bulk_change(self, changed_by=None, **values):
+        """
+        Apply ``values`` to every task in a single UPDATE, with the side effects
+        a save() would have had: status changes are recorded as TaskEvents by
+        ``changed_by``, completed or archived tasks release their reminders,
+        archived tasks move to ArchivedTask, and the overdue rollup and
+        listing caches are refreshed. Returns the ids of the changed tasks.
+        """
+        rows = list(self.values_list('id', 'assignee_id', 'status'))
+        task_ids = [task_id for task_id, _, _ in rows]
+        officer_ids = {assignee_id for _, assignee_id, _ in rows}
+        if 'assignee' in values:
+            officer_ids.add(values['assignee'].pk)
+        if not task_ids:
+            return task_ids
+
+        with transaction.atomic(using=self.db):
+            Task.objects.using(self.db).filter(id__in=task_ids).update(updated_at=timezone.now(), **values)
+            if 'status' in values:
+                TaskEvent.objects.using(self.db).bulk_create([
+                    TaskEvent(task_id=task_id, actor=changed_by, from_status=status, to_status=values['status'])
+                    for task_id, _, status in rows if status != values['status']
+                ])
+            if values.get('status') == 'signed-dispatched' or values.get('is_archived'):
+                Reminder.objects.using(self.db).filter(tasks__in=task_ids, is_active=True).update(is_active=False)
+            mark_data_changed(self.db)
+            transaction.on_commit(
+                lambda: OverdueSummary.objects.db_manager(self.db).refresh(officer_ids), using=self.db,
+            )
+            changes = dict(values)
+            if 'assignee' in changes:
+                changes['assignee_id'] = changes.pop('assignee').pk
+            if 'status' in changes:
+                changed = Task(status=changes['status'])
+                changes.update(status_display=changed.get_status_display(), progress=changed.get_progress())
+            publish_tasks(task_ids, officer_ids, changes, self.db)
+            if values.get('is_archived'):
+                # Moved straight away, so the archive listings, which read
+                # ArchivedTask only, show them as soon as this commits.
+                ArchivedTask.objects.using(self.db).move_archived(len(task_ids), task_ids)
+        return task_ids
+
 
 class Task(models.Model):
     STATUS_CHOICES = [
@@ -18,19 +129,58 @@ class Task(models.Model):
     is_archived = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    file = models.FileField(upload_to='task_files/', null=True, blank=True)
+    file = models.FileField(upload_to='task_files/', storage=get_task_file_storage, null=True, blank=True)
+    file_name = models.CharField(max_length=255, blank=True)  # As uploaded; stored files are named by content
+    attachment_text = models.TextField(blank=True)  # Copied from the file's Blob, for search
+
+    objects = TaskQuerySet.as_manager()
+
+    changed_by = None  # Set to the user making a change, for its TaskEvent
+
+    class Meta:
+        # Partial indexes mirror the dashboard filters: active vs archived
+        # listings in keyset order, per-officer filters and the overdue scan.
+        indexes = [
+            models.Index(fields=['-updated_at', '-id'], condition=Q(is_archived=False), name='task_active_recent_idx'),
+            models.Index(
+                fields=['assignee', '-updated_at', '-id'], condition=Q(is_archived=False), name='task_active_assignee_idx',
+            ),
+            models.Index(
+                fields=['assignee', 'status', '-updated_at', '-id'],
+                condition=Q(is_archived=False),
+                name='task_assignee_status_idx',
+            ),
+            # No status condition: Django passes the IN list as parameters, and
+            # SQLite only uses a partial index whose condition is literally in the query.
+            models.Index(fields=['deadline'], condition=Q(is_archived=False), name='task_active_deadline_idx'),
+            models.Index(fields=['-updated_at', '-id'], condition=Q(is_archived=True), name='task_archived_recent_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded values so signal handlers can tell what changed.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # The status event written by the post_save handler commits with the row.
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+    PROGRESS = {
+        'dispatched-officer': 25,
+        'draft': 50,
+        'finalized-draft': 75,
+        'signed-dispatched': 100,
+    }
+
     def get_progress(self):
-        progress_map = {
-            'dispatched-officer': 25,
-            'draft': 50,
-            'finalized-draft': 75,
-            'signed-dispatched': 100,
-        }
-        return progress_map.get(self.status, 0)
+        return self.PROGRESS.get(self.status, 0)
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -40,6 +190,94 @@ class Profile(models.Model):
     def __str__(self):
         return self.user.username
 
+class ReminderQuerySet(models.QuerySet):
+    AUTOMATIC_MESSAGE = "These tasks have passed their deadline. Please update their status."
+
+    def pending_for(self, user, now=None):
+        # Active reminders that still cover at least one overdue task, with the
+        # sender and every covered task loaded up front for the banner.
+        return self.filter(
+            user=user,
+            is_active=True,
+            is_dismissed=False,
+            tasks__is_archived=False,
+            tasks__deadline__lt=now or timezone.now(),
+            tasks__status__in=OPEN_STATUSES,
+        ).distinct().select_related('created_by').only(
+            'id', 'created_at', 'message', 'created_by', 'created_by__username',
+        ).prefetch_related(
+            Prefetch('tasks', queryset=Task.objects.only('id', 'title', 'deadline', 'status')),
+        )
+
+    def tasks_to_remind(self, since, until):
+        """
+        Open tasks whose deadline fell in ``(since, until]``, and those created
+        or changed since ``since`` with a deadline already past, that aren't on
+        an open reminder yet.
+        """
+        reminded = self.model.tasks.through.objects.using(self.db).filter(
+            reminder__is_active=True, reminder__is_dismissed=False,
+        ).values('task_id')
+        return Task.objects.using(self.db).active().filter(
+            Q(deadline__gt=since) | Q(updated_at__gt=since), status__in=OPEN_STATUSES, deadline__lte=until,
+        ).exclude(id__in=reminded)
+
+    def remind_overdue(self, since, until):
+        """
+        Remind officers about ``tasks_to_remind(since, until)``.
+
+        Each task joins its officer's open reminder from the task's creator, or
+        a new one; reminders and their task links are written in bulk. Returns
+        ``{officer_id: [task_id, ...]}`` for the tasks that were added.
+        """
+        crossed = self.tasks_to_remind(since, until).values_list(
+            'id', 'title', 'assignee_id', 'created_by_id', 'created_by__username',
+        )
+        groups = defaultdict(list)
+        senders = {}
+        for task_id, title, officer_id, sender_id, sender in crossed:
+            groups[officer_id, sender_id].append((task_id, title))
+            senders[sender_id] = sender
+        if not groups:
+            return {}
+
+        reminder_ids = {}
+        open_reminders = self.filter(
+            user_id__in={officer_id for officer_id, _ in groups}, is_active=True, is_dismissed=False,
+        ).order_by('created_at', 'id').values_list('id', 'user_id', 'created_by_id', 'message')
+        messages = {}
+        for reminder_id, officer_id, sender_id, message in open_reminders:
+            if (officer_id, sender_id) in groups:
+                reminder_ids[officer_id, sender_id] = reminder_id  # The newest one wins
+                messages[reminder_id] = message
+
+        with transaction.atomic(using=self.db):
+            new_reminders = self.bulk_create([
+                self.model(user_id=officer_id, created_by_id=sender_id, message=self.AUTOMATIC_MESSAGE)
+                for officer_id, sender_id in groups if (officer_id, sender_id) not in reminder_ids
+            ])
+            for reminder in new_reminders:
+                reminder_ids[reminder.user_id, reminder.created_by_id] = reminder.id
+                messages[reminder.id] = reminder.message
+
+            links = self.model.tasks.through
+            links.objects.using(self.db).bulk_create([
+                links(reminder_id=reminder_ids[key], task_id=task_id)
+                for key, tasks in groups.items() for task_id, _ in tasks
+            ], ignore_conflicts=True)
+            mark_data_changed(self.db)
+
+            reminded = defaultdict(list)
+            for (officer_id, sender_id), tasks in groups.items():
+                reminder_id = reminder_ids[officer_id, sender_id]
+                publish_reminder(
+                    officer_id, reminder_id, messages[reminder_id], senders[sender_id],
+                    [title for _, title in tasks], self.db,
+                )
+                reminded[officer_id].extend(task_id for task_id, _ in tasks)
+        return dict(reminded)
+
+
 class Reminder(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reminders')
     tasks = models.ManyToManyField(Task, related_name='reminders')
@@ -49,5 +287,346 @@ class Reminder(models.Model):
     message = models.TextField(blank=True, null=True)
     is_dismissed = models.BooleanField(default=False)
 
+    objects = ReminderQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Reminder for {self.user.username} by {self.created_by.username}"
+
+class Notification(models.Model):
+    KIND_CHOICES = [
+        ('assignment', 'Task assignment'),
+        ('reminder', 'Overdue reminder'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='assignment')
+    tasks = models.ManyToManyField(Task, related_name='notifications')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    phone_number = models.CharField(max_length=15, blank=True, null=True)
+    message = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
     def __str__(self):
-        return f"Reminder for {self.user.username} by {self.created_by.username}"
\ No newline at end of file
+        return f"{self.get_kind_display()} notification for {self.user.username} ({self.status})"
+
+
+class ArchivedTaskQuerySet(ListingQuerySet):
+    def move_archived(self, limit=1000, task_ids=None):
+        """
+        Move up to ``limit`` archived tasks (of ``task_ids``, if given) out of
+        the live table, with their reminder links, in one transaction. Ids,
+        file references and search text go along unchanged. Returns how many
+        tasks were moved.
+        """
+        fields = [field.attname for field in Task._meta.concrete_fields if field.name != 'is_archived']
+        archived = Task.objects.using(self.db).archived()
+        if task_ids is not None:
+            archived = archived.filter(id__in=task_ids)
+        with transaction.atomic(using=self.db):
+            rows = list(archived.order_by('id').select_for_update(skip_locked=True).values(*fields)[:limit])
+            if not rows:
+                return 0
+            task_ids = [row['id'] for row in rows]
+            self.bulk_create([self.model(**row) for row in rows])
+
+            links = Reminder.tasks.through.objects.using(self.db).filter(task_id__in=task_ids)
+            archived_links = self.model.reminders.through
+            archived_links.objects.using(self.db).bulk_create([
+                archived_links(archivedtask_id=task_id, reminder_id=reminder_id)
+                for reminder_id, task_id in links.values_list('reminder_id', 'task_id')
+            ])
+            links.delete()
+            Notification.tasks.through.objects.using(self.db).filter(task_id__in=task_ids).delete()
+            # The file references moved with the rows, so the file column is
+            # left unloaded for release_task_file to pass over; archived tasks
+            # aren't overdue either way.
+            Task.objects.using(self.db).filter(id__in=task_ids).only(
+                'id', 'status', 'deadline', 'assignee', 'is_archived',
+            ).delete()
+        return len(task_ids)
+
+    def restore(self):
+        """
+        Move these tasks back into the live table as active tasks, with their
+        reminder links, in one transaction. Returns the ids of the restored
+        tasks.
+        """
+        fields = [field.attname for field in self.model._meta.concrete_fields if field.name != 'archived_at']
+        with transaction.atomic(using=self.db):
+            rows = list(self.order_by('id').select_for_update().values(*fields))
+            if not rows:
+                return []
+            task_ids = [row['id'] for row in rows]
+            tasks = Task.objects.using(self.db).bulk_create([Task(is_archived=False, **row) for row in rows])
+            # bulk_create stamps created_at as if the tasks were new.
+            for task, row in zip(tasks, rows):
+                task.created_at = row['created_at']
+            Task.objects.using(self.db).bulk_update(tasks, ['created_at'])
+
+            archived_links = self.model.reminders.through.objects.using(self.db).filter(archivedtask_id__in=task_ids)
+            Reminder.tasks.through.objects.using(self.db).bulk_create([
+                Reminder.tasks.through(task_id=task_id, reminder_id=reminder_id)
+                for reminder_id, task_id in archived_links.values_list('reminder_id', 'archivedtask_id')
+            ])
+            archived_links.delete()
+            # Unloaded file column, as in move_archived: the references move back.
+            self.model.objects.using(self.db).filter(id__in=task_ids).only('id').delete()
+
+            officer_ids = {row['assignee_id'] for row in rows}
+            mark_data_changed(self.db)
+            transaction.on_commit(
+                lambda: OverdueSummary.objects.db_manager(self.db).refresh(officer_ids), using=self.db,
+            )
+        return task_ids
+
+
+class ArchivedTaskManager(models.Manager.from_queryset(ArchivedTaskQuerySet)):
+    def get_queryset(self):
+        # Lets exports and the API select is_archived as they do for live tasks.
+        return super().get_queryset().annotate(is_archived=Value(True))
+
+
+class ArchivedTask(models.Model):
+    """
+    Cold storage for archived tasks, so the live table and its indexes only
+    carry work in progress. Rows keep the id they had as a Task.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=50, choices=Task.STATUS_CHOICES)
+    deadline = models.DateTimeField(null=True, blank=True)
+    assignee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_tasks')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_archived_tasks')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    file = models.FileField(upload_to='task_files/', storage=get_task_file_storage, null=True, blank=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    attachment_text = models.TextField(blank=True)
+    reminders = models.ManyToManyField(Reminder, related_name='archived_tasks')
+
+    objects = ArchivedTaskManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-updated_at', '-id'], name='archivedtask_recent_idx'),
+            models.Index(fields=['assignee', '-updated_at', '-id'], name='archivedtask_assignee_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def get_progress(self):
+        return Task.PROGRESS.get(self.status, 0)
+
+
+class TaskEventQuerySet(models.QuerySet):
+    def timeline(self, task_id):
+        return self.filter(task_id=task_id).order_by('created_at', 'id')
+
+    def cycle_times(self, start='dispatched-officer', end='signed-dispatched'):
+        """
+        When each task first entered ``start`` and first reached ``end``, as
+        ``{'task_id', 'started', 'finished'}`` rows from one grouped query over
+        the status index. ``finished`` is None for tasks still under way.
+        """
+        return self.filter(to_status__in=[start, end]).values('task_id').annotate(
+            started=Min('created_at', filter=Q(to_status=start)),
+            finished=Min('created_at', filter=Q(to_status=end)),
+        ).order_by('task_id')
+
+
+class TaskEvent(models.Model):
+    """
+    Append-only history of task status changes, written in the same
+    transaction as the change. ``task_id`` is not a foreign key, so the
+    history outlives the move to ArchivedTask (which keeps ids) and deletion.
+    """
+
+    task_id = models.BigIntegerField()
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    from_status = models.CharField(max_length=50, blank=True)  # Blank when the task was created
+    to_status = models.CharField(max_length=50)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = TaskEventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['task_id', 'created_at'], name='task_event_timeline_idx'),
+            models.Index(fields=['to_status', 'created_at'], name='task_event_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id}: {self.from_status or 'created'} -> {self.to_status}"
+
+
+class OverdueSummaryManager(models.Manager):
+    LISTED_TASKS = 10
+
+    def refresh(self, officer_ids=None, now=None):
+        """
+        Recompute the rollup for ``officer_ids`` (or everyone) from one grouped
+        aggregate plus a per-officer top-N of the oldest overdue tasks.
+        """
+        overdue = Task.objects.db_manager(self.db).overdue(now)
+        if officer_ids is not None:
+            officer_ids = set(officer_ids)
+            overdue = overdue.filter(assignee_id__in=officer_ids)
+
+        totals = overdue.values('assignee_id').annotate(count=Count('id'), oldest=Min('deadline')).order_by()
+        listed = overdue.annotate(
+            position=Window(RowNumber(), partition_by=F('assignee_id'), order_by=[F('deadline').asc(), F('id').asc()]),
+        ).filter(position__lte=self.LISTED_TASKS).order_by('assignee_id', 'position').values_list(
+            'assignee_id', 'id', 'title', 'deadline',
+        )
+
+        tasks_by_officer = {}
+        for officer_id, task_id, title, deadline in listed:
+            tasks_by_officer.setdefault(officer_id, []).append(
+                {'id': task_id, 'title': title, 'deadline': deadline.isoformat()}
+            )
+        summaries = [
+            self.model(
+                officer_id=row['assignee_id'],
+                overdue_count=row['count'],
+                oldest_deadline=row['oldest'],
+                tasks=tasks_by_officer.get(row['assignee_id'], []),
+            )
+            for row in totals
+        ]
+
+        with transaction.atomic(using=self.db):
+            stale = self.exclude(officer_id__in=[summary.officer_id for summary in summaries])
+            if officer_ids is not None:
+                stale = stale.filter(officer_id__in=officer_ids)
+            stale.delete()
+            self.bulk_create(
+                summaries,
+                update_conflicts=True,
+                unique_fields=['officer'],
+                update_fields=['overdue_count', 'oldest_deadline', 'tasks', 'refreshed_at'],
+            )
+            mark_data_changed(self.db)
+        return len(summaries)
+
+
+class OverdueSummary(models.Model):
+    officer = models.OneToOneField(User, on_delete=models.CASCADE, related_name='overdue_summary')
+    overdue_count = models.PositiveIntegerField(default=0)
+    oldest_deadline = models.DateTimeField()
+    tasks = models.JSONField(default=list)  # Oldest overdue tasks: [{'id', 'title', 'deadline'}]
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    objects = OverdueSummaryManager()
+
+    def __str__(self):
+        return f"{self.officer.username}: {self.overdue_count} overdue"
+
+    def listed_tasks(self):
+        return [dict(task, deadline=parse_datetime(task['deadline'])) for task in self.tasks]
+
+
+class ScanWatermark(models.Model):
+    """How far a periodic scan has got, so each run only looks at rows past it."""
+
+    name = models.CharField(max_length=50, unique=True)
+    position = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+
+class BlobManager(models.Manager):
+    def referencing(self, name):
+        # Previews are content-addressed too, so blobs may share one.
+        return self.filter(Q(name=name) | Q(preview=name)).exists()
+
+    def acquire(self, name):
+        storage = get_task_file_storage()
+        if not storage.is_content_addressed(name):
+            return
+        with transaction.atomic(using=self.db):
+            blob, created = self.select_for_update().get_or_create(
+                name=name, defaults={'size': storage.size(name), 'refcount': 1},
+            )
+            if created:
+                from .tasks import queue_attachment_processing
+                queue_attachment_processing(blob.pk, using=self.db)
+            else:
+                self.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+        return blob
+
+    def release(self, name):
+        storage = get_task_file_storage()
+        if not storage.is_content_addressed(name):
+            return
+        with transaction.atomic(using=self.db):
+            blob = self.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            if blob.refcount > 1:
+                self.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+                return
+            blob.delete()
+
+            def delete_files():
+                # Unless the same content was attached again in the meantime.
+                for stored in filter(None, [name, blob.preview]):
+                    if not self.referencing(stored):
+                        storage.delete(stored)
+
+            transaction.on_commit(delete_files, using=self.db)
+
+
+class Blob(models.Model):
+    """A stored attachment, shared by every task whose file has the same content."""
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Filled in by the process_attachment celery task.
+    text = models.TextField(blank=True)
+    preview = models.CharField(max_length=255, blank=True)
+    processed_version = models.PositiveSmallIntegerField(default=0)
+
+    objects = BlobManager()
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class UploadSession(models.Model):
+    """A resumable upload received in chunks; the file moves into task storage once complete."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    stored_name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.UPLOAD_SESSION_DIR, f"{self.id}.part")
+
+    def is_complete(self):
+        return bool(self.stored_name)
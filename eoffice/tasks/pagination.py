@@ -0,0 +1,134 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """
+    Seek-method pagination over ``(ordering_field, pk)``.
+
+    Each page is fetched with a ``WHERE (field, pk) < (last_field, last_pk)``
+    style predicate instead of an OFFSET, so page N costs the same as page 1.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-updated_at', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = [name.lstrip('-') for name in ordering]
+        self.descending = ordering[0].startswith('-')
+
+    def _model_field(self, name):
+        try:
+            return self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None  # A numeric annotation such as search_rank
+
+    def encode_cursor(self, obj):
+        # ``obj`` is a model instance, or a dict when paginating values().
+        values = []
+        for name in self.fields:
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if len(values) != len(self.fields):
+                raise ValueError
+            decoded = []
+            for name, value in zip(self.fields, values):
+                field = self._model_field(name)
+                decoded.append(field.to_python(value) if field else float(value))
+            return decoded
+        except (ValueError, TypeError, ValidationError) as exc:
+            raise InvalidCursor(cursor) from exc
+
+    def seek(self, values, forward):
+        # Rows strictly after ``values`` in the listing order (or before them
+        # when paging backwards), expanded as a lexicographic comparison.
+        lookup = 'lt' if self.descending == forward else 'gt'
+        condition = Q()
+        for index, name in enumerate(self.fields):
+            clause = Q(**{f"{name}__{lookup}": values[index]})
+            for prior, value in zip(self.fields[:index], values[:index]):
+                clause &= Q(**{prior: value})
+            condition |= clause
+        return condition
+
+    def page(self, after=None, before=None):
+        if before:
+            reverse_ordering = [name[1:] if name.startswith('-') else f"-{name}" for name in self.ordering]
+            queryset = self.queryset.filter(self.seek(self.decode_cursor(before), forward=False))
+            rows = list(queryset.order_by(*reverse_ordering)[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            queryset = self.queryset
+            if after:
+                queryset = queryset.filter(self.seek(self.decode_cursor(after), forward=True))
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = bool(after)
+
+        return KeysetPage(
+            rows,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=self.encode_cursor(rows[-1]) if rows else None,
+            previous_cursor=self.encode_cursor(rows[0]) if rows else None,
+        )
+
+
+class KeysetPaginationMixin:
+    """ListView mixin replacing Django's OFFSET paginator with KeysetPaginator."""
+
+    paginate_by = 50
+    keyset_ordering = ('-updated_at', '-id')
+
+    def get_keyset_ordering(self):
+        # Search results are listed by relevance instead of recency.
+        if self.request.GET.get('search'):
+            return ('-search_rank', '-id')
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, ordering=self.get_keyset_ordering())
+        try:
+            page = paginator.page(after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+        except InvalidCursor:
+            page = paginator.page()
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,51 @@
+from django.contrib import messages
+from django.core.cache import cache
+from django.shortcuts import redirect
+
+ROLE_CACHE_TIMEOUT = 60 * 60
+
+
+def role_cache_key(user_id):
+    return f"tasks:role:{user_id}"
+
+
+def is_manager(user):
+    """
+    Whether ``user`` has manager rights, resolved at most once per request and
+    cached across requests until the user's Profile changes.
+    """
+    if not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return True
+    if not hasattr(user, '_is_manager'):
+        from .models import Profile
+
+        key = role_cache_key(user.pk)
+        value = cache.get(key)
+        if value is None:
+            value = Profile.objects.filter(user_id=user.pk, is_manager=True).exists()
+            cache.set(key, value, ROLE_CACHE_TIMEOUT)
+        user._is_manager = value
+    return user._is_manager
+
+
+def invalidate_role(user_id):
+    cache.delete(role_cache_key(user_id))
+
+
+def can_edit_task(user, task):
+    return task.assignee_id == user.pk or is_manager(user)
+
+
+class ManagerRequiredMixin:
+    """Redirect non-managers away with an error message; use after LoginRequiredMixin."""
+
+    permission_denied_message = "Only managers can access this page."
+    permission_denied_url = 'employee_dashboard'
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.is_manager:
+            messages.error(request, self.permission_denied_message)
+            return redirect(self.permission_denied_url)
+        return super().dispatch(request, *args, **kwargs)
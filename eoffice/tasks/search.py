@@ -0,0 +1,206 @@
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+# Snippets mark matched terms with these control characters; the ``highlight``
+# template filter escapes the text and turns them into <mark> tags.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TOKENS = 8
+
+# Live tasks and the archive (ArchivedTask) have the same searchable columns
+# and each gets its own index.
+SEARCHED_TABLES = ('tasks_task', 'tasks_archivedtask')
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query)[:MAX_TOKENS]
+
+
+def existing_columns(connection, columns, table='tasks_task'):
+    # Earlier migrations install the index before later columns or tables exist.
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return []
+        present = {column.name for column in connection.introspection.get_table_description(cursor, table)}
+    return [column for column in columns if column in present]
+
+
+class LikeSearchBackend:
+    """Fallback for databases without full-text support: unindexed LIKE scans."""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) | Q(description__icontains=query) | Q(attachment_text__icontains=query)
+        ).annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_snippet=Value('', output_field=TextField()),
+        )
+
+    def install(self, connection):
+        pass
+
+    def uninstall(self, connection):
+        pass
+
+
+class SQLiteSearchBackend:
+    """
+    SQLite FTS5 external-content index over ``(title, description,
+    attachment_text)``, named after its table, e.g. ``tasks_task_fts``.
+
+    The index is maintained by triggers, so ORM saves, ``update()`` and
+    ``bulk_create()`` all keep it in sync without any Python-side hooks.
+    """
+
+    columns = ('title', 'description', 'attachment_text')
+
+    def match_expression(self, query):
+        # Every term must match; each is a quoted prefix query so user input
+        # can never be interpreted as FTS5 syntax.
+        return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return LikeSearchBackend().search(queryset, query)  # Nothing indexable, e.g. only punctuation
+        table = queryset.model._meta.db_table
+        fts = f"{table}_fts"
+        # The index is joined once, so rank and snippets come from the same
+        # MATCH instead of a correlated lookup per matching row.
+        return queryset.extra(
+            tables=[fts], where=[f'{fts}.rowid = "{table}"."id"', f"{fts} MATCH %s"], params=[match],
+        ).annotate(
+            search_rank=RawSQL(f"-bm25({fts})", (), output_field=FloatField()),
+            search_snippet=RawSQL(
+                # From the description, or the attachment text when only that matched.
+                f"CASE WHEN instr({self.snippet(fts, 'description')}, char(2)) "
+                f"OR {self.snippet(fts, 'attachment_text')} = '' THEN {self.snippet(fts, 'description')} "
+                f"ELSE {self.snippet(fts, 'attachment_text')} END",
+                (), output_field=TextField(),
+            ),
+        )
+
+    def snippet(self, fts, column):
+        return f"snippet({fts}, {self.columns.index(column)}, char(2), char(3), '…', 16)"
+
+    def install(self, connection):
+        for table in SEARCHED_TABLES:
+            indexed = existing_columns(connection, self.columns, table)
+            if indexed:
+                self.install_table(connection, table, indexed)
+
+    def install_table(self, connection, table, indexed):
+        fts = f"{table}_fts"
+        columns = ', '.join(indexed)
+        new_values = ', '.join(f"new.{column}" for column in indexed)
+        old_values = ', '.join(f"old.{column}" for column in indexed)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", (f"{fts}_%",)
+            )
+            triggers_missing = cursor.fetchone()[0] < 3
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', "
+                f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+                f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+            )
+            # SQLite drops triggers whenever a migration rebuilds the table,
+            # so re-index from the content table if they had to be recreated.
+            if triggers_missing:
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+    def uninstall(self, connection):
+        with connection.cursor() as cursor:
+            for table in SEARCHED_TABLES:
+                for suffix in ('insert', 'delete', 'update'):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+class PostgresSearchBackend:
+    """
+    ``tsvector`` search backed by a GIN expression index per table, e.g.
+    ``tasks_task_search_idx``.
+
+    The index is computed from the row itself, so PostgreSQL keeps it in sync.
+    """
+
+    columns = ('title', 'description', 'attachment_text')
+
+    def document(self, table='', columns=None):
+        text = " || ' ' || ".join(f"coalesce({table}{column}, '')" for column in columns or self.columns)
+        return f"to_tsvector('simple', {text})"
+
+    def tsquery(self, query):
+        return ' & '.join(f"{token}:*" for token in tokenize(query))
+
+    def search(self, queryset, query):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return LikeSearchBackend().search(queryset, query)
+        table = queryset.model._meta.db_table
+        document = self.document(table=f'"{table}".')
+        options = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=24, MinWords=8"
+        return queryset.alias(
+            search_match=RawSQL(f"{document} @@ to_tsquery('simple', %s)", (tsquery,), output_field=BooleanField()),
+        ).filter(search_match=True).annotate(
+            search_rank=RawSQL(f"ts_rank({document}, to_tsquery('simple', %s))", (tsquery,), output_field=FloatField()),
+            search_snippet=RawSQL(
+                f"ts_headline('simple', coalesce(\"{table}\".\"description\", '') || ' ' || "
+                f"coalesce(\"{table}\".\"attachment_text\", ''), to_tsquery('simple', %s), %s)",
+                (tsquery, options), output_field=TextField(),
+            ),
+        )
+
+    def install(self, connection):
+        with connection.cursor() as cursor:
+            for table in SEARCHED_TABLES:
+                indexed = existing_columns(connection, self.columns, table)
+                if not indexed:
+                    continue
+                # The index comment records the columns it was built over. An
+                # index from before a column existed no longer matches the
+                # expression search() uses, so it is rebuilt.
+                cursor.execute("SELECT obj_description(to_regclass(%s), 'pg_class')", (f"{table}_search_idx",))
+                if cursor.fetchone()[0] == ','.join(indexed):
+                    continue
+                cursor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+                cursor.execute(
+                    f"CREATE INDEX {table}_search_idx ON {table} USING GIN ({self.document(columns=indexed)})"
+                )
+                cursor.execute(f"COMMENT ON INDEX {table}_search_idx IS %s", (','.join(indexed),))
+
+    def uninstall(self, connection):
+        with connection.cursor() as cursor:
+            for table in SEARCHED_TABLES:
+                cursor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+
+
+def get_search_backend(using='default'):
+    if settings.TASK_SEARCH_BACKEND:
+        return import_string(settings.TASK_SEARCH_BACKEND)()
+    vendor = connections[using].vendor
+    if vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return LikeSearchBackend()
@@ -1,10 +1,152 @@
+import os
+
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, post_migrate, pre_save
 from django.dispatch import receiver
-from .models import Profile
+from django.utils import timezone
+from .models import ArchivedTask, Blob, Profile, Reminder, Task, TaskEvent, OverdueSummary, OPEN_STATUSES
+from .backends import invalidate_user
+from .conditional import mark_data_changed
+from .events import publish_reminder, publish_task
+from .directory import invalidate_directory
+from .permissions import invalidate_role
+from .search import get_search_backend
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         is_manager = instance.is_superuser  # Superusers are managers by default
-        Profile.objects.create(user=instance, is_manager=is_manager, phone_number='+1234567890')
\ No newline at end of file
+        Profile.objects.create(user=instance, is_manager=is_manager, phone_number='+1234567890')
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cached_role(sender, instance, **kwargs):
+    invalidate_role(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_assignee_directory(sender, update_fields=None, **kwargs):
+    if update_fields == frozenset({'last_login'}):
+        return  # Logging in doesn't change the directory
+    invalidate_directory()
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    # Re-create search triggers/indexes that schema changes may have dropped.
+    connection = connections[using]
+    if sender.name == 'tasks' and 'tasks_task' in connection.introspection.table_names():
+        get_search_backend(using).install(connection)
+
+
+def counts_as_overdue(values, now):
+    return (
+        not values['is_archived'] and values['status'] in OPEN_STATUSES
+        and values['deadline'] is not None and values['deadline'] < now
+    )
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def refresh_overdue_summary(sender, instance, using, created=False, **kwargs):
+    # Only saves that add a task to, or take one off, an officer's overdue list
+    # touch the manager dashboard rollup, and only for the officers involved;
+    # the periodic refresh picks up tasks that become overdue over time.
+    now = timezone.now()
+    current = {field: getattr(instance, field) for field in ('status', 'deadline', 'assignee_id', 'is_archived')}
+    officer_ids = {instance.assignee_id} if counts_as_overdue(current, now) else set()
+    loaded = getattr(instance, '_loaded_values', {})
+    if not created and loaded:
+        previous = {field: loaded.get(field, current[field]) for field in current}
+        if not current.keys() <= loaded.keys() or counts_as_overdue(previous, now):
+            officer_ids.add(previous['assignee_id'])
+    if officer_ids:
+        transaction.on_commit(lambda: OverdueSummary.objects.db_manager(using).refresh(officer_ids), using=using)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=ArchivedTask)
+@receiver(post_save, sender=Reminder)
+@receiver(post_delete, sender=Reminder)
+@receiver(m2m_changed, sender=Reminder.tasks.through)
+def mark_listings_changed(sender, using, **kwargs):
+    mark_data_changed(using)
+
+
+@receiver(post_save, sender=Task)
+def publish_task_change(sender, instance, using, **kwargs):
+    previous_assignee_id = getattr(instance, '_loaded_values', {}).get('assignee_id')
+    if previous_assignee_id == instance.assignee_id:
+        previous_assignee_id = None
+    publish_task(instance, previous_assignee_id, using)
+
+
+@receiver(m2m_changed, sender=Reminder.tasks.through)
+def publish_new_reminder(sender, instance, action, reverse, pk_set, using, **kwargs):
+    # Reminders are created first and given their tasks afterwards.
+    if action == 'post_add' and not reverse and pk_set:
+        titles = Task.objects.using(using).filter(id__in=pk_set).values_list('title', flat=True)
+        publish_reminder(instance.user_id, instance.id, instance.message, instance.created_by.username, titles, using)
+
+
+@receiver(post_save, sender=Task)
+def record_status_change(sender, instance, created, using, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    if not created and 'status' not in loaded:
+        return  # Loaded without the status column, so it can't have changed
+    previous = '' if created else loaded['status']
+    if previous != instance.status:
+        actor = instance.changed_by
+        TaskEvent.objects.using(using).create(
+            task_id=instance.pk,
+            actor_id=actor.pk if actor else instance.created_by_id if created else None,
+            from_status=previous,
+            to_status=instance.status,
+        )
+    instance._loaded_values = {**loaded, 'status': instance.status}
+
+
+@receiver(pre_save, sender=Task)
+def remember_file_name(sender, instance, **kwargs):
+    # Stored names are content hashes; keep the name the file was uploaded as.
+    if instance.file and not instance.file._committed:
+        instance.file_name = os.path.basename(instance.file.name)
+
+
+@receiver(post_save, sender=Task)
+def track_file_references(sender, instance, created, using, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    if not created and 'file' not in loaded:
+        return  # Loaded without the file column, so it can't have changed
+    previous = loaded.get('file') or ''
+    current = instance.file.name or ''
+    if previous != current:
+        blobs = Blob.objects.db_manager(using)
+        blob = blobs.acquire(current) if current else None
+        if previous:
+            blobs.release(previous)
+        # Content that was seen before is searchable right away; new files
+        # get their text once process_attachment has run.
+        text = blob.text if blob else ''
+        if instance.attachment_text != text:
+            sender.objects.using(using).filter(pk=instance.pk).update(attachment_text=text)
+            instance.attachment_text = text
+    instance._loaded_values = {**loaded, 'file': current}
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=ArchivedTask)
+def release_task_file(sender, instance, using, **kwargs):
+    name = str(instance.__dict__.get('file') or '')  # Not loaded if deferred
+    if name:
+        Blob.objects.db_manager(using).release(name)
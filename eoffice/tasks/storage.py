@@ -0,0 +1,64 @@
+import hashlib
+import os
+import shutil
+
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores each distinct file once, named by its SHA-256 (``cas/ab/abcdef…``).
+
+    Saving content that is already stored returns the existing name without
+    writing anything; ``Blob`` rows count the tasks using each file so it is
+    only removed once the last one lets go. Names outside ``cas/`` (files
+    uploaded before this storage) are served as they are.
+    """
+
+    prefix = 'cas'
+
+    def name_for(self, digest):
+        return f"{self.prefix}/{digest[:2]}/{digest}"
+
+    def is_content_addressed(self, name):
+        return bool(name) and name.startswith(f"{self.prefix}/")
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        name = self.name_for(digest.hexdigest())
+        if self.exists(name):
+            return name
+        content.seek(0)
+        return super()._save(name, content)
+
+    def save_path(self, path, digest=None):
+        """Move a fully received file at ``path`` into the store and return its name."""
+        name = self.name_for(digest or file_digest(path))
+        if self.exists(name):
+            os.remove(path)
+            return name
+        target = self.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+        if self.file_permissions_mode is not None:
+            os.chmod(target, self.file_permissions_mode)
+        return name
+
+
+task_file_storage = ContentAddressedStorage()
+
+
+def get_task_file_storage():
+    return task_file_storage
@@ -1,38 +1,322 @@
-from celery import shared_task
+import logging
+import os
+from datetime import timedelta
+
 import requests
+from celery import shared_task
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class SMSDeliveryError(Exception):
+    pass
+
+
+class TextBeltSMSBackend:
+    # One pooled session per worker process, shared by every delivery.
+    _session = None
+
+    @classmethod
+    def get_session(cls):
+        if cls._session is None:
+            retry = Retry(
+                total=settings.SMS_MAX_RETRIES,
+                read=0,  # Never resend once the provider may have accepted the message
+                backoff_factor=0.5,
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=frozenset({'POST'}),
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=10, max_retries=retry)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            cls._session = session
+        return cls._session
+
+    def send(self, phone_number, message):
+        response = self.get_session().post(settings.TEXTBELT_URL, data={
+            'phone': phone_number,  # e.g., +233241234567
+            'message': message,
+            'key': settings.TEXTBELT_KEY,
+        }, timeout=settings.SMS_TIMEOUT)
+        data = response.json()
+        if not data.get('success'):
+            raise SMSDeliveryError(data.get('error', 'Unknown TextBelt error'))
+        return str(data.get('textId', ''))
+
+
+# Messages "sent" by LocmemSMSBackend, for tests and offline development.
+outbox = []
+
+
+class LocmemSMSBackend:
+    def send(self, phone_number, message):
+        outbox.append({'phone_number': phone_number, 'message': message})
+        return f"locmem-{len(outbox)}"
+
+
+def get_sms_backend():
+    return import_string(settings.SMS_BACKEND)()
+
+
+def queue_notification(user_id, task_ids, kind='assignment'):
+    # Nothing is sent from the request: the notification is handed to celery
+    # only once the task rows it refers to are committed. Callbacks are robust:
+    # with the broker down the request still succeeds (the error is logged) and
+    # the beat jobs pick the work up later.
+    task_ids = list(task_ids)
+    transaction.on_commit(lambda: coalesce_notification.delay(user_id, task_ids, kind), robust=True)
+
+
+def queue_attachment_processing(blob_id, using='default'):
+    transaction.on_commit(lambda: process_attachment.delay(blob_id), using=using, robust=True)
+
+
+def queue_task_assignment_notification(task_id, assignee_id):
+    queue_notification(assignee_id, [task_id], kind='assignment')
+
+
+def build_notification_message(notification, tasks):
+    url = settings.SITE_URL.rstrip('/') + reverse('employee_dashboard')
+    if notification.kind == 'reminder':
+        prefix = f"Reminder: {len(tasks)} overdue task(s)"
+    elif len(tasks) == 1:
+        prefix = "New task assigned"
+    else:
+        prefix = f"{len(tasks)} new tasks assigned"
+
+    listed = [
+        f"{task.title} (Deadline: {timezone.localtime(task.deadline):%Y-%m-%d %H:%M})" if task.deadline else task.title
+        for task in tasks[:3]
+    ]
+    if len(tasks) > 3:
+        listed.append(f"and {len(tasks) - 3} more")
+    return f"{prefix}: {'; '.join(listed)}. View: {url}"
+
 
 @shared_task
-def send_task_assignment_notification(task_id, assignee_id):
-    from .models import Task, Profile
-    from django.contrib.auth.models import User
+def coalesce_notification(user_id, task_ids, kind='assignment'):
+    from .models import Notification
+
+    window = timedelta(seconds=settings.NOTIFICATION_COALESCE_SECONDS)
+    with transaction.atomic():
+        notification = (
+            Notification.objects.select_for_update()
+            .filter(user_id=user_id, kind=kind, status='pending', created_at__gte=timezone.now() - window)
+            .order_by('-created_at')
+            .first()
+        )
+        if notification is None:
+            notification = Notification.objects.create(user_id=user_id, kind=kind)
+            transaction.on_commit(lambda: deliver_notification.apply_async(
+                (notification.id,), countdown=settings.NOTIFICATION_COALESCE_SECONDS,
+            ))
+        notification.tasks.add(*task_ids)
+    return notification.id
+
+
+@shared_task(bind=True)
+def deliver_notification(self, notification_id):
+    from .models import Notification, Profile
+
+    # Claim the row so a duplicate or late delivery never sends twice.
+    claimed = Notification.objects.filter(id=notification_id, status='pending').update(status='sending')
+    if not claimed:
+        return
+
+    notification = Notification.objects.select_related('user').get(id=notification_id)
+    tasks = list(notification.tasks.only('id', 'title', 'deadline').order_by('deadline', 'id'))
+    phone_number = Profile.objects.filter(user_id=notification.user_id).values_list('phone_number', flat=True).first()
 
+    notification.phone_number = phone_number
+    notification.message = build_notification_message(notification, tasks) if tasks else ''
+    if not (phone_number and tasks):
+        notification.status = 'skipped'
+        notification.error = 'No phone number' if not phone_number else 'No tasks'
+        notification.save(update_fields=['status', 'error', 'phone_number', 'message'])
+        logger.info("Skipped notification %s for %s: %s", notification.id, notification.user.username, notification.error)
+        return
+
+    notification.attempts += 1
     try:
-        task = Task.objects.get(id=task_id)
-        assignee = User.objects.get(id=assignee_id)
-        profile = Profile.objects.get(user=assignee)
-
-        # SMS notification via TextBelt
-        if profile.phone_number:
-            sms_body = (
-                f"New task assigned: {task.title}. "
-                f"Deadline: {task.deadline}. "
-                f"View: http://127.0.0.1:8000/tasks/employee/dashboard/"
-            )
-            response = requests.post('https://textbelt.com/text', {
-                'phone': profile.phone_number,  # e.g., +233241234567
-                'message': sms_body,
-                'key': 'textbelt',  # Free key for 1 SMS/day
-            })
-            if response.json()['success']:
-                print(f"SMS sent to {profile.phone_number}")
-            else:
-                print(f"SMS failed: {response.json()['error']}")
-        else:
-            print(f"No phone number for user {assignee.username}")
-
-    except User.DoesNotExist:
-        print(f"User with id {assignee_id} does not exist.")
-    except Profile.DoesNotExist:
-        print(f"Profile for user {assignee.username} does not exist.")
-    except Exception as e:
-        print(f"Error sending notification for task {task_id}: {str(e)}")
\ No newline at end of file
+        get_sms_backend().send(phone_number, notification.message)
+    except (requests.RequestException, ValueError, SMSDeliveryError) as exc:
+        notification.error = str(exc)
+        if notification.attempts >= settings.SMS_MAX_ATTEMPTS:
+            notification.status = 'failed'
+            notification.save(update_fields=['status', 'error', 'attempts', 'phone_number', 'message'])
+            logger.error("SMS to %s failed permanently: %s", phone_number, exc)
+            return
+        notification.status = 'pending'
+        notification.save(update_fields=['status', 'error', 'attempts', 'phone_number', 'message'])
+        logger.warning("SMS to %s failed (attempt %s): %s", phone_number, notification.attempts, exc)
+        raise self.retry(exc=exc, countdown=settings.SMS_RETRY_BACKOFF * 2 ** (notification.attempts - 1), max_retries=None)
+
+    notification.status = 'sent'
+    notification.error = ''
+    notification.sent_at = timezone.now()
+    notification.save(update_fields=['status', 'error', 'attempts', 'sent_at', 'phone_number', 'message'])
+    logger.info("SMS sent to %s", phone_number)
+
+
+@shared_task
+def refresh_overdue_summaries():
+    from .models import OverdueSummary
+
+    return OverdueSummary.objects.refresh()
+
+
+@shared_task
+def scan_overdue_tasks():
+    """Remind officers about tasks that went overdue since the previous run."""
+    from .models import OverdueSummary, Reminder, ScanWatermark
+
+    now = timezone.now()
+    with transaction.atomic():
+        watermark, created = ScanWatermark.objects.select_for_update().get_or_create(
+            name='overdue-tasks', defaults={'position': now},
+        )
+        if created:
+            return 0  # Start from now instead of reminding about the whole backlog
+        reminded = Reminder.objects.remind_overdue(watermark.position, now)
+        watermark.position = now
+        watermark.save(update_fields=['position', 'updated_at'])
+        for officer_id, task_ids in reminded.items():
+            queue_notification(officer_id, task_ids, kind='reminder')
+
+    if reminded:
+        OverdueSummary.objects.refresh(list(reminded))
+    return sum(len(task_ids) for task_ids in reminded.values())
+
+
+@shared_task
+def purge_upload_sessions():
+    """Drop chunked uploads that were abandoned or never attached to a task."""
+    from .models import Blob, UploadSession
+    from .storage import get_task_file_storage
+
+    storage = get_task_file_storage()
+    cutoff = timezone.now() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    stale = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for session in stale:
+        if os.path.exists(session.part_path):
+            os.remove(session.part_path)
+    UploadSession.objects.filter(pk__in=[session.pk for session in stale]).delete()
+
+    # Completed files nothing refers to: no task holds them and no live session either.
+    stored_names = {session.stored_name for session in stale if session.stored_name}
+    claimed = set(Blob.objects.filter(name__in=stored_names).values_list('name', flat=True))
+    claimed |= set(UploadSession.objects.filter(stored_name__in=stored_names).values_list('stored_name', flat=True))
+    for name in stored_names - claimed:
+        storage.delete(name)
+    return len(stale)
+
+
+@shared_task
+def archive_completed_tasks(days=None, batch_size=None):
+    """
+    Archive tasks signed and dispatched more than AUTO_ARCHIVE_AFTER_DAYS ago,
+    going by their status history, so later edits don't hold them back. Each
+    batch is one bulk_change, so reminders are released, the tasks moved to
+    the archive table and listings refreshed as for a manual archive, and no
+    transaction holds the write lock for long.
+    """
+    from django.db.models import OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+
+    from .models import Task, TaskEvent
+
+    days = settings.AUTO_ARCHIVE_AFTER_DAYS if days is None else days
+    if not days:
+        return 0
+    batch_size = batch_size or settings.AUTO_ARCHIVE_BATCH_SIZE
+    signed_at = (
+        TaskEvent.objects.filter(task_id=OuterRef('pk'), to_status='signed-dispatched')
+        .order_by('-created_at').values('created_at')[:1]
+    )
+    completed = (
+        Task.objects.active().filter(status='signed-dispatched')
+        # Tasks signed before the history was kept go by their last change.
+        .annotate(signed_at=Coalesce(Subquery(signed_at), 'updated_at'))
+        .filter(signed_at__lt=timezone.now() - timedelta(days=days))
+    )
+    archived = 0
+    while True:
+        task_ids = list(completed.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not task_ids:
+            break
+        archived += len(Task.objects.filter(id__in=task_ids).bulk_change(is_archived=True))
+    if archived:
+        logger.info("Archived %s task(s) completed more than %s day(s) ago", archived, days)
+    return archived
+
+
+@shared_task
+def move_archived_tasks(batch_size=None):
+    """
+    Move archived tasks into ArchivedTask, one transaction per batch so the
+    live table is never locked for long. bulk_change moves the tasks it
+    archives itself; this picks up those archived any other way (imports,
+    a plain save or update) after the fact and on a beat.
+    """
+    from .models import ArchivedTask
+
+    batch_size = batch_size or settings.ARCHIVE_MOVE_BATCH_SIZE
+    moved = 0
+    while True:
+        count = ArchivedTask.objects.move_archived(batch_size)
+        moved += count
+        if count < batch_size:
+            return moved
+
+
+@shared_task(acks_late=True, soft_time_limit=300)
+def process_attachment(blob_id, force=False):
+    """
+    Extract search text and a preview from a stored file. Results are kept per
+    Blob, so each distinct file is processed once however many tasks share it;
+    running again is a no-op unless forced or PROCESSOR_VERSION changed.
+    """
+    from .attachments import PROCESSOR_VERSION, extract
+    from .conditional import mark_data_changed
+    from .models import ArchivedTask, Blob, Task
+    from .storage import get_task_file_storage
+
+    blob = Blob.objects.filter(pk=blob_id).first()
+    if blob is None or (blob.processed_version == PROCESSOR_VERSION and not force):
+        return False
+    storage = get_task_file_storage()
+    try:
+        with storage.open(blob.name, 'rb') as file:
+            text, preview = extract(file)
+    except FileNotFoundError:
+        return False
+    except Exception:
+        # A damaged or unusual file shouldn't be retried forever.
+        logger.exception("Could not process attachment %s", blob.name)
+        text, preview = '', None
+    preview_name = storage.save('preview.jpg', ContentFile(preview)) if preview else ''
+
+    with transaction.atomic():
+        updated = Blob.objects.filter(pk=blob.pk).update(
+            text=text, preview=preview_name, processed_version=PROCESSOR_VERSION,
+        )
+        if updated:
+            for model in (Task, ArchivedTask):
+                model.objects.filter(file=blob.name).exclude(attachment_text=text).update(attachment_text=text)
+            mark_data_changed()
+    if updated:
+        stale = blob.preview if blob.preview != preview_name else ''
+    else:
+        stale = preview_name  # The file was released while we worked
+    if stale and not Blob.objects.referencing(stale):
+        storage.delete(stale)
+    return True
@@ -0,0 +1,15 @@
+from django import template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from tasks.search import HIGHLIGHT_START, HIGHLIGHT_END
+
+register = template.Library()
+
+
+@register.filter
+def highlight(snippet):
+    """Escape a search snippet and wrap the matched terms in <mark>."""
+    return mark_safe(
+        escape(snippet or '').replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    )
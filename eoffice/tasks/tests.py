@@ -1,3 +1,1201 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import zipfile
+from contextlib import closing
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.http import HttpRequest
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import api, attachments, events, tasks as notifications
+from .directory import get_assignee_directory
+from .management.commands import copy_database
+from .models import ArchivedTask, Blob, Profile, Task, TaskEvent, Notification, OverdueSummary, Reminder, ScanWatermark, UploadSession
+from .pagination import KeysetPaginator
+from .permissions import is_manager
+from .metrics import registry
+from .storage import get_task_file_storage
+
+
+def make_user(username, is_manager=False, **kwargs):
+    user = User.objects.create_user(username=username, password='password', **kwargs)
+    if is_manager:
+        user.profile.is_manager = True
+        user.profile.save()
+    return user
+
+
+def make_task(assignee, created_by, **kwargs):
+    kwargs.setdefault('title', 'Task')
+    return Task.objects.create(assignee=assignee, created_by=created_by, **kwargs)
+
+
+@override_settings(SMS_BACKEND='tasks.tasks.LocmemSMSBackend')
+class NotificationPipelineTests(TestCase):
+    def setUp(self):
+        notifications.outbox.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+
+    def test_task_create_does_not_send_inline(self):
+        self.client.force_login(self.manager)
+        with mock.patch.object(notifications.coalesce_notification, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('task_create'), {
+                    'title': 'Draft memo',
+                    'status': 'dispatched-officer',
+                    'assignee': self.officer.id,
+                })
+        task = Task.objects.get(title='Draft memo')
+        delay.assert_called_once_with(self.officer.id, [task.id], 'assignment')
+        self.assertEqual(notifications.outbox, [])
+
+    def test_broker_outage_does_not_fail_the_request(self):
+        self.client.force_login(self.manager)
+        with mock.patch.object(notifications.coalesce_notification, 'delay', side_effect=ConnectionError) as delay:
+            with self.assertLogs('django.test', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('task_create'), {
+                    'title': 'Draft memo',
+                    'status': 'dispatched-officer',
+                    'assignee': self.officer.id,
+                })
+        delay.assert_called_once()
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Task.objects.filter(title='Draft memo').exists())
+
+    def test_assignments_within_window_are_coalesced(self):
+        first = make_task(self.officer, self.manager, title='First')
+        second = make_task(self.officer, self.manager, title='Second')
+        with mock.patch.object(notifications.deliver_notification, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                notification_id = notifications.coalesce_notification(self.officer.id, [first.id])
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(notifications.coalesce_notification(self.officer.id, [second.id]), notification_id)
+        apply_async.assert_called_once()
+
+        notifications.deliver_notification(notification_id)
+        notification = Notification.objects.get(id=notification_id)
+        self.assertEqual(notification.status, 'sent')
+        self.assertEqual(notification.attempts, 1)
+        self.assertEqual(len(notifications.outbox), 1)
+        self.assertIn('2 new tasks assigned', notifications.outbox[0]['message'])
+
+    def test_delivery_is_not_repeated(self):
+        task = make_task(self.officer, self.manager, deadline=timezone.now() + timedelta(days=1))
+        notification = Notification.objects.create(user=self.officer)
+        notification.tasks.add(task)
+        notifications.deliver_notification(notification.id)
+        notifications.deliver_notification(notification.id)
+        self.assertEqual(len(notifications.outbox), 1)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        for index in range(5):
+            make_task(self.officer, self.manager, title=f"Draft {index}", status='draft')
+        make_task(self.officer, self.manager, title='Other', status='finalized-draft')
+        self.client.force_login(self.manager)
+
+    def test_pages_walk_forward_and_back_with_filters(self):
+        url = reverse('task_list')
+        with mock.patch('tasks.views.TaskListView.paginate_by', 2):
+            first = self.client.get(url, {'status': 'draft'})
+            page = first.context['page_obj']
+            self.assertFalse(page.has_previous())
+            self.assertTrue(page.has_next())
+            self.assertContains(first, 'status=draft&amp;after=')
+
+            seen = [task.title for task in page]
+            response = first
+            while response.context['page_obj'].has_next():
+                response = self.client.get(url, {'status': 'draft', 'after': response.context['page_obj'].next_cursor})
+                seen.extend(task.title for task in response.context['page_obj'])
+            self.assertEqual(seen, [f"Draft {index}" for index in reversed(range(5))])
+
+            back = self.client.get(url, {'status': 'draft', 'before': response.context['page_obj'].previous_cursor})
+            self.assertEqual([task.title for task in back.context['page_obj']], ['Draft 2', 'Draft 1'])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse('task_list'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['tasks']), 6)
+
+
+class DashboardQueryCountTests(TestCase):
+    def setUp(self):
+        self.manager = make_user('manager', is_manager=True)
+        self.officers = [make_user(f"officer{index}") for index in range(3)]
+
+    def add_rows(self, count):
+        overdue = timezone.now() - timedelta(days=1)
+        for index in range(count):
+            officer = self.officers[index % len(self.officers)]
+            make_task(officer, self.manager, title=f"Task {index}", deadline=overdue)
+            make_task(officer, self.manager, title=f"Archived {index}", is_archived=True)
+            reminder = Reminder.objects.create(user=officer, created_by=self.manager, message='Please update')
+            reminder.tasks.set(Task.objects.filter(assignee=officer, is_archived=False))
+
+    def count_queries(self, user, url_name):
+        cache.clear()
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        pages = [
+            (self.manager, 'task_list'),
+            (self.manager, 'manager_dashboard'),
+            (self.manager, 'archived_dashboard'),
+            (self.officers[0], 'employee_dashboard'),
+        ]
+        self.add_rows(1)
+        baseline = {url_name: self.count_queries(user, url_name) for user, url_name in pages}
+        self.add_rows(12)
+        for user, url_name in pages:
+            with self.subTest(url_name=url_name):
+                self.assertEqual(self.count_queries(user, url_name), baseline[url_name])
+
+
+class ExplainTaskQueriesTests(TestCase):
+    def test_prints_a_plan_per_query(self):
+        officer = make_user('officer')
+        make_task(officer, make_user('manager', is_manager=True), deadline=timezone.now())
+        out = io.StringIO()
+        call_command('explain_task_queries', officer='officer', stdout=out)
+        self.assertIn('manager_dashboard: overdue officers', out.getvalue())
+        self.assertIn('task_active_deadline_idx', out.getvalue())
+
+    def test_unknown_officer(self):
+        with self.assertRaisesMessage(CommandError, "No user named 'nobody'."):
+            call_command('explain_task_queries', officer='nobody', stdout=io.StringIO())
+
+
+class TaskSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+
+    def test_prefix_search_ranks_and_highlights(self):
+        memo = make_task(self.officer, self.manager, title='Budget memo', description='Annual <b>budget</b> review')
+        make_task(self.officer, self.manager, title='Leave request', description='Mentions the budget once')
+        make_task(self.officer, self.manager, title='Unrelated', description='Nothing to see')
+
+        results = list(Task.objects.search('budg').order_by('-search_rank'))
+        self.assertEqual([task.title for task in results], ['Budget memo', 'Leave request'])
+        self.assertEqual(results[0].id, memo.id)
+
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('task_list'), {'search': 'budg'})
+        self.assertEqual([task.title for task in response.context['tasks']], ['Budget memo', 'Leave request'])
+        self.assertContains(response, '&lt;b&gt;<mark>budget</mark>&lt;/b&gt;', html=False)
+
+    def test_search_results_page_by_rank(self):
+        for index in range(5):
+            make_task(self.officer, self.manager, title=f"Memo {index}", description='budget ' * (index + 1))
+        queryset = Task.objects.search('budget')
+        # One MATCH gives rank and snippet alike; no lookup per matching row.
+        self.assertEqual(str(queryset.query).count('MATCH'), 1)
+        paginator = KeysetPaginator(queryset, 2, ordering=('-search_rank', '-id'))
+        first = paginator.page()
+        second = paginator.page(after=first.next_cursor)
+        ranked = list(queryset.order_by('-search_rank', '-id').values_list('title', flat=True))
+        self.assertEqual([task.title for task in [*first, *second]], ranked[:4])
+        self.assertIn('\x02budget\x03', second.object_list[0].search_snippet)
+
+    def test_index_follows_updates_and_deletes(self):
+        task = make_task(self.officer, self.manager, title='Procurement plan')
+        Task.objects.filter(id=task.id).update(title='Recruitment plan')
+        self.assertFalse(Task.objects.search('procurement').exists())
+        self.assertTrue(Task.objects.search('recruit').exists())
+        task.delete()
+        self.assertFalse(Task.objects.search('recruit').exists())
+
+    def test_search_syntax_is_not_interpreted(self):
+        make_task(self.officer, self.manager, title='Quarterly report')
+        self.assertFalse(Task.objects.search('report" OR title:*').exists())
+        self.assertTrue(Task.objects.search('"report').exists())
+
+
+class OverdueSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        self.other = make_user('other')
+
+    def test_refresh_groups_overdue_tasks_per_officer(self):
+        now = timezone.now()
+        oldest = make_task(self.officer, self.manager, title='Oldest', deadline=now - timedelta(days=3))
+        make_task(self.officer, self.manager, title='Recent', deadline=now - timedelta(hours=1))
+        make_task(self.officer, self.manager, title='Done', deadline=now - timedelta(days=5), status='signed-dispatched')
+        make_task(self.other, self.manager, title='Future', deadline=now + timedelta(days=1))
+
+        self.assertEqual(OverdueSummary.objects.refresh(), 1)
+        summary = OverdueSummary.objects.get()
+        self.assertEqual(summary.officer, self.officer)
+        self.assertEqual(summary.overdue_count, 2)
+        self.assertEqual(summary.oldest_deadline, oldest.deadline)
+        self.assertEqual([task['title'] for task in summary.listed_tasks()], ['Oldest', 'Recent'])
+
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('manager_dashboard'))
+        self.assertContains(response, '2 overdue')
+
+    def test_saving_a_task_refreshes_its_officer(self):
+        task = make_task(self.officer, self.manager, deadline=timezone.now() - timedelta(days=1))
+        OverdueSummary.objects.refresh()
+        task = Task.objects.get(id=task.id)
+        task.assignee = self.other
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+        self.assertEqual(list(OverdueSummary.objects.values_list('officer__username', flat=True)), ['other'])
+
+    def test_saves_that_dont_affect_overdue_tasks_skip_the_refresh(self):
+        task = make_task(self.officer, self.manager, deadline=timezone.now() + timedelta(days=1))
+        task = Task.objects.get(id=task.id)
+        task.title = 'Renamed'
+        with mock.patch.object(OverdueSummary.objects, 'refresh') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                task.save()
+                make_task(self.other, self.manager)
+        refresh.assert_not_called()
+
+
+class RoleResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+
+    def test_role_is_cached_until_profile_changes(self):
+        self.assertFalse(is_manager(User.objects.get(id=self.officer.id)))
+        officer = User.objects.get(id=self.officer.id)
+        with self.assertNumQueries(0):
+            self.assertFalse(is_manager(officer))
+
+        self.officer.profile.is_manager = True
+        self.officer.profile.save()
+        self.assertTrue(is_manager(User.objects.get(id=self.officer.id)))
+
+    def test_officers_cannot_reach_manager_views(self):
+        other = make_user('other')
+        task = make_task(other, self.manager)
+        self.client.force_login(self.officer)
+        self.assertRedirects(self.client.get(reverse('manager_dashboard')), reverse('employee_dashboard'))
+        self.assertRedirects(self.client.get(reverse('task_create')), reverse('task_list'), target_status_code=200)
+        self.assertEqual(self.client.get(reverse('task_update', args=[task.id])).status_code, 404)
+
+
+class AssigneeDirectoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer', first_name='Ama', last_name='Mensah')
+
+    def test_directory_is_cached_until_users_change(self):
+        self.assertEqual(len(get_assignee_directory()), 2)
+        with self.assertNumQueries(0):
+            get_assignee_directory()
+        self.client.force_login(self.officer)  # Only touches last_login
+        with self.assertNumQueries(0):
+            get_assignee_directory()
+
+        make_user('newcomer')
+        self.assertIn('newcomer', [entry['username'] for entry in get_assignee_directory()])
+
+    def test_autocomplete_is_for_managers_only(self):
+        url = reverse('assignee_autocomplete')
+        self.client.force_login(self.officer)
+        self.assertEqual(self.client.get(url, {'q': 'ama'}).status_code, 403)
+
+        self.client.force_login(self.manager)
+        response = self.client.get(url, {'q': 'ama'})
+        self.assertEqual(response.json()['results'], [{'id': self.officer.id, 'username': 'officer', 'name': 'Ama Mensah'}])
+
+    def test_task_form_does_not_render_every_user(self):
+        for index in range(5):
+            make_user(f"extra{index}")
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('task_create'))
+        self.assertNotContains(response, 'extra3')
+        response = self.client.post(reverse('task_create'), {
+            'title': 'Memo', 'status': 'draft', 'assignee': self.officer.id,
+        })
+        self.assertEqual(Task.objects.get(title='Memo').assignee, self.officer)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        self.task = make_task(self.officer, self.manager, title='Budget memo')
+        self.client.force_login(self.manager)
+
+    def test_unchanged_listing_is_not_modified(self):
+        url = reverse('task_list')
+        self.client.get(url)  # Sets the CSRF cookie the validators depend on
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([query for query in queries if 'tasks_task' in query['sql']])
+
+    def test_rendered_pages_are_reused_until_data_changes(self):
+        url = reverse('employee_dashboard')
+        make_task(self.manager, self.manager, title='Late memo', deadline=timezone.now() - timedelta(days=1))
+        self.client.get(url)
+        first = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url)
+        self.assertFalse([query for query in queries if 'tasks_task' in query['sql']])
+        self.assertEqual(second.content, first.content)
+        self.assertContains(second, 'class="table-danger"')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(title='Late memo').bulk_change(status='signed-dispatched')
+        self.assertNotContains(self.client.get(url), 'class="table-danger"')
+
+    def test_changes_and_filters_produce_new_validators(self):
+        url = reverse('task_list')
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'status': 'draft'})['ETag'], etag)
+
+        self.task.title = 'Budget memo (revised)'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Budget memo (revised)')
+
+    def test_pending_messages_skip_validators(self):
+        self.client.get(reverse('manager_dashboard'))
+        officer = self.client_class()
+        officer.force_login(self.officer)
+        response = officer.get(reverse('manager_dashboard'), follow=True)
+        self.assertContains(response, 'Only managers can access the manager dashboard.')
+        self.assertFalse(response.has_header('ETag'))
+
+
+class BulkTaskActionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        self.other = make_user('other')
+        overdue = timezone.now() - timedelta(days=1)
+        self.tasks = [make_task(self.officer, self.manager, title=f"Task {index}", deadline=overdue) for index in range(3)]
+        self.reminder = Reminder.objects.create(user=self.officer, created_by=self.manager, message='Please update')
+        self.reminder.tasks.set(self.tasks[:1])
+
+    def post(self, user, **data):
+        self.client.force_login(user)
+        data.setdefault('tasks', [task.id for task in self.tasks])
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('task_bulk_action'), data)
+
+    def test_status_change_is_one_update(self):
+        with mock.patch.object(Task, 'save') as save:
+            self.post(self.manager, action='status', status='signed-dispatched')
+        save.assert_not_called()
+        self.assertEqual(set(Task.objects.values_list('status', flat=True)), {'signed-dispatched'})
+        self.reminder.refresh_from_db()
+        self.assertFalse(self.reminder.is_active)
+        self.assertFalse(OverdueSummary.objects.exists())
+
+    def test_reassign_batches_notifications(self):
+        self.tasks[0].assignee = self.other
+        self.tasks[0].save()
+        with mock.patch.object(notifications.coalesce_notification, 'delay') as delay:
+            response = self.post(self.manager, action='reassign', assignee=self.other.id, next=reverse('task_list'))
+        self.assertRedirects(response, reverse('task_list'))
+        delay.assert_called_once_with(self.other.id, [task.id for task in self.tasks[1:]], 'assignment')
+        self.assertEqual(Task.objects.filter(assignee=self.other).count(), 3)
+        self.assertEqual(OverdueSummary.objects.get().officer, self.other)
+
+    def test_employees_cannot_archive_or_touch_other_tasks(self):
+        other_task = make_task(self.other, self.manager)
+        self.post(self.officer, action='archive')
+        self.assertFalse(Task.objects.archived().exists())
+        self.post(self.officer, action='status', status='draft', tasks=[self.tasks[0].id, other_task.id])
+        self.assertFalse(Task.objects.filter(status='draft').exists())
+        self.post(self.officer, action='status', status='draft', tasks=[self.tasks[0].id])
+        self.assertEqual(list(Task.objects.filter(status='draft')), [self.tasks[0]])
+
+
+class TaskEventTests(TestCase):
+    def setUp(self):
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+
+    def test_changes_are_published_to_affected_users(self):
+        broker = mock.Mock()
+        with mock.patch('tasks.events.get_broker', return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                task = make_task(self.officer, self.manager, title='Budget memo')
+            with self.captureOnCommitCallbacks(execute=True):
+                reminder = Reminder.objects.create(user=self.officer, created_by=self.manager)
+                reminder.tasks.set([task])
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.objects.filter(id=task.id).bulk_change(status='draft')
+
+        (task_channels, task_event), (reminder_channels, reminder_event), (bulk_channels, bulk_event) = [
+            call.args for call in broker.publish.call_args_list
+        ]
+        self.assertEqual(set(task_channels), {'managers', f"user:{self.officer.id}"})
+        self.assertEqual(task_event['title'], 'Budget memo')
+        self.assertEqual(list(reminder_channels), [f"user:{self.officer.id}"])
+        self.assertEqual(reminder_event['tasks'], ['Budget memo'])
+        self.assertEqual(bulk_event['changes'], {'status': 'draft', 'status_display': 'Draft', 'progress': 50})
+
+    async def test_stream_delivers_events_for_the_user(self):
+        await self.async_client.aforce_login(self.officer)
+        response = await self.async_client.get(reverse('task_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        events.get_broker().publish([f"user:{self.manager.id}"], {'type': 'task', 'id': 1})
+        events.get_broker().publish([f"user:{self.officer.id}"], {'type': 'reminder', 'id': 2})
+        self.assertEqual(await asyncio.wait_for(waiting, 5), b'event: reminder\ndata: {"type": "reminder", "id": 2}\n\n')
+
+    def test_stream_is_refused_under_wsgi(self):
+        self.client.force_login(self.officer)
+        self.assertEqual(self.client.get(reverse('task_events')).status_code, 204)
+        self.assertNotContains(self.client.get(reverse('employee_dashboard')), 'EventSource')
+
+    async def test_stream_requires_login(self):
+        response = await self.async_client.get(reverse('task_events'))
+        self.assertEqual(response.status_code, 401)
+
+
+class TaskApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        self.other = make_user('other')
+        for index in range(3):
+            make_task(self.officer, self.manager, title=f"Officer task {index}", status='draft')
+        make_task(self.other, self.manager, title='Other task')
+
+    def test_list_uses_visibility_fields_and_cursors(self):
+        self.client.force_login(self.officer)
+        url = reverse('api_task_list')
+        response = self.client.get(url, {'fields': 'id,title,progress', 'limit': 2})
+        data = response.json()
+        self.assertEqual(data['results'], [
+            {'id': task.id, 'title': task.title, 'progress': 50}
+            for task in Task.objects.filter(assignee=self.officer).order_by('-updated_at', '-id')[:2]
+        ])
+        rest = self.client.get(url, {'fields': 'title', 'after': data['next']}).json()
+        self.assertEqual(rest, {'results': [{'title': 'Officer task 0'}], 'next': None, 'previous': rest['previous']})
+
+        self.assertEqual(self.client.get(url, {'fields': 'password'}).status_code, 400)
+        other_task = Task.objects.get(title='Other task')
+        self.assertEqual(self.client.get(reverse('api_task_detail', args=[other_task.id])).status_code, 404)
+
+    def test_responses_are_conditional_and_compressed(self):
+        self.client.force_login(self.manager)
+        url = reverse('api_task_list')
+        self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        profiles = self.client.get(reverse('api_profile_list'))
+        self.assertEqual(len(profiles.json()['results']), 3)
+        self.assertEqual(self.client.get(reverse('api_profile_list'), HTTP_IF_NONE_MATCH=profiles['ETag']).status_code, 304)
+
+    def test_missing_brotli_is_logged_once_when_asked_for(self):
+        self.client.force_login(self.manager)
+        url = reverse('api_task_list')
+        with mock.patch.object(api, 'brotli', None), mock.patch.object(attachments, '_missing_warned', set()):
+            with self.assertLogs('tasks.attachments', 'WARNING') as logs:
+                for _ in range(2):
+                    response = self.client.get(url, HTTP_ACCEPT_ENCODING='br, gzip')
+                    self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('Brotli is not installed', logs.output[0])
+
+    def test_patch_and_bulk_update(self):
+        task = Task.objects.filter(assignee=self.officer).first()
+        self.client.force_login(self.officer)
+        response = self.client.patch(
+            reverse('api_task_detail', args=[task.id]), {'status': 'finalized-draft'}, content_type='application/json',
+        )
+        self.assertEqual(response.json()['status'], 'finalized-draft')
+        response = self.client.patch(
+            reverse('api_task_detail', args=[task.id]), {'status': 'done'}, content_type='application/json',
+        )
+        self.assertIn('status', response.json()['errors'])
+
+        ids = list(Task.objects.filter(assignee=self.officer).values_list('id', flat=True))
+        response = self.client.post(
+            reverse('api_task_bulk'), {'ids': ids, 'status': 'signed-dispatched'}, content_type='application/json',
+        )
+        self.assertEqual(sorted(response.json()['updated']), sorted(ids))
+        self.assertEqual(Task.objects.filter(status='signed-dispatched').count(), 3)
+
+    def test_reminders_list_their_tasks(self):
+        reminder = Reminder.objects.create(user=self.officer, created_by=self.manager, message='Please update')
+        reminder.tasks.set(Task.objects.filter(assignee=self.officer))
+        self.client.force_login(self.officer)
+        results = self.client.get(reverse('api_reminder_list'), {'fields': 'id,tasks'}).json()['results']
+        self.assertEqual(results, [{'id': reminder.id, 'tasks': sorted(reminder.tasks.values_list('id', flat=True))}])
+
+
+class TaskExportTests(TestCase):
+    def setUp(self):
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        make_task(self.officer, self.manager, title='=HYPERLINK("x")', status='draft', is_archived=True)
+        make_task(self.officer, self.manager, title='Budget memo', status='finalized-draft', is_archived=True)
+        make_task(self.officer, self.manager, title='Active memo', status='draft')
+        notifications.move_archived_tasks()
+
+    def test_csv_export_streams_filtered_rows(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('archived_export', args=['csv']), {'status': 'draft'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'ID,Title,Description,Status,Assignee,Created by,Deadline,Created at,Updated at,Archived')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"\'=HYPERLINK(""x"")",,Draft,officer,manager', lines[1])
+
+    def test_xlsx_export_is_a_valid_workbook(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('task_export', args=['xlsx']))
+        workbook = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(workbook.testzip())
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 2)
+        self.assertIn('Active memo', sheet)
+
+    def test_export_is_for_managers(self):
+        self.client.force_login(self.officer)
+        self.assertRedirects(self.client.get(reverse('task_export', args=['csv'])), reverse('employee_dashboard'))
+
+
+class ArchivedTaskTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, TASK_FILE_SENDFILE='')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        overdue = timezone.now() - timedelta(days=1)
+        self.tasks = [
+            make_task(self.officer, self.manager, title=f"Procurement memo {index}", deadline=overdue)
+            for index in range(3)
+        ]
+        self.tasks[0].file = SimpleUploadedFile('memo.txt', b'minutes')
+        self.tasks[0].save()
+        self.reminder = Reminder.objects.create(user=self.officer, created_by=self.manager, message='Please update')
+        self.reminder.tasks.set(self.tasks)
+
+    def archive(self, tasks):
+        self.client.force_login(self.manager)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('task_bulk_action'), {'tasks': [task.id for task in tasks], 'action': 'archive'})
+
+    def test_archived_tasks_move_out_of_the_live_table(self):
+        self.archive(self.tasks[:2])
+        self.assertEqual(list(Task.objects.all()), [self.tasks[2]])
+        archived = ArchivedTask.objects.order_by('id')
+        self.assertEqual([task.id for task in archived], [task.id for task in self.tasks[:2]])
+        self.assertEqual(archived[0].file.name, self.tasks[0].file.name)
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        self.assertEqual(list(self.reminder.tasks.all()), [self.tasks[2]])
+        self.assertEqual(set(self.reminder.archived_tasks.all()), set(archived))
+        self.assertEqual(notifications.move_archived_tasks(), 0)  # Nothing left behind
+
+        response = self.client.get(reverse('archived_dashboard'), {'search': 'procure'})
+        self.assertEqual([task.id for task in response.context['tasks']], [task.id for task in reversed(self.tasks[:2])])
+        self.assertFalse(Task.objects.search('procure').exclude(pk=self.tasks[2].pk).exists())
+        api = self.client.get(reverse('api_task_list'), {'archived': 1, 'fields': 'id,is_archived'}).json()
+        self.assertEqual(len(api['results']), 2)
+        self.assertTrue(all(row['is_archived'] for row in api['results']))
+
+        self.client.force_login(self.officer)
+        response = self.client.get(reverse('task_file', args=[self.tasks[0].pk]))
+        self.assertEqual(b''.join(response.streaming_content), b'minutes')
+
+    def test_completed_tasks_are_archived_after_a_while(self):
+        old = timezone.now() - timedelta(days=40)
+        Task.objects.filter(pk=self.tasks[0].pk).bulk_change(status='signed-dispatched')
+        TaskEvent.objects.filter(task_id=self.tasks[0].pk, to_status='signed-dispatched').update(created_at=old)
+        # Signed long ago but edited since; the edit doesn't hold it back.
+        Task.objects.filter(pk=self.tasks[0].pk).update(title='Procurement memo, corrected')
+        # Signed before the history was kept, so its last change counts.
+        Task.objects.filter(pk=self.tasks[1].pk).update(status='signed-dispatched', updated_at=old)
+        Task.objects.filter(pk=self.tasks[2].pk).update(updated_at=old)  # Old, but still open
+        recent = make_task(self.officer, self.manager, status='signed-dispatched')
+        Task.objects.filter(pk=recent.pk).update(updated_at=old)  # Signed just now, per its history
+        with self.settings(AUTO_ARCHIVE_AFTER_DAYS=0):
+            self.assertEqual(notifications.archive_completed_tasks(), 0)  # Opt-in
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(notifications.archive_completed_tasks(days=30, batch_size=1), 2)
+        self.assertEqual(set(ArchivedTask.objects.values_list('id', flat=True)), {self.tasks[0].pk, self.tasks[1].pk})
+        self.assertFalse(Task.objects.filter(pk__in=[self.tasks[2].pk, recent.pk], is_archived=True).exists())
+        self.reminder.refresh_from_db()
+        self.assertFalse(self.reminder.is_active)
+
+    def test_managers_can_restore_archived_tasks(self):
+        created_at = self.tasks[0].created_at
+        self.archive(self.tasks[:1])
+        url = reverse('archived_task_restore', args=[self.tasks[0].pk])
+        self.client.force_login(self.officer)
+        self.client.post(url)
+        self.assertTrue(ArchivedTask.objects.exists())
+
+        self.client.force_login(self.manager)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url)
+        self.assertRedirects(response, reverse('task_update', args=[self.tasks[0].pk]))
+        self.assertFalse(ArchivedTask.objects.exists())
+        task = Task.objects.active().get(pk=self.tasks[0].pk)
+        self.assertEqual(task.created_at, created_at)
+        self.assertEqual(task.file.name, self.tasks[0].file.name)
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        self.assertIn(task, self.reminder.tasks.all())
+        self.assertEqual(list(Task.objects.search('procurement').filter(pk=task.pk)), [task])
+        self.assertEqual(OverdueSummary.objects.get(officer=self.officer).overdue_count, 3)
+        self.assertEqual(self.client.post(url).status_code, 302)  # Already restored
+
+    def test_tasks_archived_elsewhere_are_moved_later(self):
+        Task.objects.filter(pk__in=[self.tasks[0].pk, self.tasks[1].pk]).update(is_archived=True)
+        self.assertFalse(ArchivedTask.objects.exists())
+        self.assertEqual(notifications.move_archived_tasks(batch_size=1), 2)
+        self.assertEqual(set(ArchivedTask.objects.values_list('id', flat=True)), {self.tasks[0].pk, self.tasks[1].pk})
+        self.assertEqual(list(Task.objects.all()), [self.tasks[2]])
+
+    def test_deleting_an_archived_task_releases_its_file(self):
+        self.archive(self.tasks[:1])
+        path = self.tasks[0].file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            ArchivedTask.objects.get().delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+
+class TaskStatusHistoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        self.task = make_task(self.officer, self.manager)
+
+    def test_status_changes_are_recorded_with_their_actor(self):
+        self.client.force_login(self.officer)
+        self.client.post(reverse('task_direct_status_update', args=[self.task.pk, 'draft']))
+        self.client.post(reverse('task_direct_status_update', args=[self.task.pk, 'draft']))
+        self.client.post(reverse('task_status_update', args=[self.task.pk]), {'status': 'finalized-draft'})
+        self.client.force_login(self.manager)
+        with mock.patch.object(Task, 'save') as save:
+            response = self.client.post(reverse('task_bulk_action'), {
+                'tasks': [self.task.pk], 'action': 'status', 'status': 'signed-dispatched',
+            })
+        save.assert_not_called()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(TaskEvent.objects.timeline(self.task.pk).values_list('actor__username', 'from_status', 'to_status')), [
+            ('manager', '', 'dispatched-officer'),
+            ('officer', 'dispatched-officer', 'draft'),
+            ('officer', 'draft', 'finalized-draft'),
+            ('manager', 'finalized-draft', 'signed-dispatched'),
+        ])
+        times = TaskEvent.objects.cycle_times().get()
+        self.assertEqual(times['task_id'], self.task.pk)
+        self.assertLessEqual(times['started'], times['finished'])
+
+    def test_history_outlives_archiving(self):
+        Task.objects.filter(pk=self.task.pk).bulk_change(is_archived=True)
+        self.client.force_login(self.officer)
+        response = self.client.get(reverse('api_task_events', args=[self.task.pk]), {'fields': 'to_status'})
+        self.assertEqual(response.json()['results'], [{'to_status': 'dispatched-officer'}])
+        self.client.force_login(make_user('other'))
+        self.assertEqual(self.client.get(reverse('api_task_events', args=[self.task.pk])).status_code, 404)
+
+
+class OverdueScanTests(TestCase):
+    def setUp(self):
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+
+    def test_scan_only_reminds_about_newly_overdue_tasks(self):
+        now = timezone.now()
+        backlog = make_task(self.officer, self.manager, title='Backlog', deadline=now - timedelta(days=3))
+        self.assertEqual(notifications.scan_overdue_tasks(), 0)  # First run only sets the watermark
+        ScanWatermark.objects.update(position=now - timedelta(hours=2))
+        Task.objects.filter(pk=backlog.pk).update(updated_at=now - timedelta(days=3))
+
+        first = make_task(self.officer, self.manager, title='First', deadline=now - timedelta(hours=1))
+        make_task(self.officer, self.manager, title='Done', deadline=now - timedelta(hours=1), status='signed-dispatched')
+        make_task(self.officer, self.manager, title='Later', deadline=now + timedelta(days=1))
+        with mock.patch.object(notifications.coalesce_notification, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(notifications.scan_overdue_tasks(), 1)
+        delay.assert_called_once_with(self.officer.id, [first.id], 'reminder')
+        reminder = Reminder.objects.get()
+        self.assertEqual(list(reminder.tasks.all()), [first])
+        self.assertEqual(OverdueSummary.objects.get(officer=self.officer).overdue_count, 2)
+
+        # A later run extends the open reminder instead of adding another.
+        second = make_task(self.officer, self.manager, title='Second', deadline=timezone.now())
+        with mock.patch.object(notifications.coalesce_notification, 'delay'):
+            self.assertEqual(notifications.scan_overdue_tasks(), 1)
+            self.assertEqual(notifications.scan_overdue_tasks(), 0)
+        self.assertEqual(set(Reminder.objects.get().tasks.all()), {first, second})
+
+    def test_scan_reminds_about_tasks_added_already_overdue(self):
+        notifications.scan_overdue_tasks()
+        ScanWatermark.objects.update(position=timezone.now() - timedelta(minutes=1))
+        late = make_task(self.officer, self.manager, title='Late', deadline=timezone.now() - timedelta(days=2))
+        redated = make_task(self.officer, self.manager, title='Redated', deadline=timezone.now() + timedelta(days=1))
+        redated.deadline = timezone.now() - timedelta(days=1)
+        redated.save()
+        sent = Reminder.objects.create(user=self.officer, created_by=self.manager, message='Please update')
+        reminded = make_task(self.officer, self.manager, title='Reminded', deadline=timezone.now() - timedelta(days=1))
+        sent.tasks.add(reminded)
+        with mock.patch.object(notifications.coalesce_notification, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(notifications.scan_overdue_tasks(), 2)
+        self.assertEqual(sorted(delay.call_args.args[1]), [late.id, redated.id])  # Not the one reminded already
+        self.assertEqual(set(sent.tasks.all()), {late, redated, reminded})
+
+
+class TaskFileUploadTests(TestCase):
+    def setUp(self):
+        media_root, upload_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, upload_dir)
+        settings = override_settings(MEDIA_ROOT=media_root, UPLOAD_SESSION_DIR=upload_dir, UPLOAD_CHUNK_MAX_BYTES=4)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        self.client.force_login(self.manager)
+
+    def put_chunk(self, url, offset, data):
+        return self.client.put(url, data, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_chunked_upload_resumes_and_attaches_to_task(self):
+        response = self.client.post(reverse('api_upload_list'), {'filename': 'memo.txt', 'size': 10},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        url = reverse('api_upload_detail', args=[response.json()['id']])
+
+        self.assertEqual(self.put_chunk(url, 0, b'0123').json()['offset'], 4)
+        self.assertEqual(self.put_chunk(url, 4, b'45678').status_code, 413)  # Over the chunk limit
+        mismatch = self.put_chunk(url, 8, b'89')
+        self.assertEqual((mismatch.status_code, mismatch.json()['offset']), (409, 4))
+        self.assertEqual(self.client.get(url).json()['offset'], 4)
+        self.put_chunk(url, 4, b'4567')
+        self.assertTrue(self.put_chunk(url, 8, b'89').json()['complete'])
+
+        session = UploadSession.objects.get()
+        response = self.client.post(reverse('task_create'), {
+            'title': 'With file', 'status': 'dispatched-officer', 'assignee': self.officer.id, 'upload': session.id,
+        })
+        self.assertEqual(response.status_code, 302)
+        task = Task.objects.get()
+        self.assertEqual(task.file_name, 'memo.txt')
+        self.assertTrue(get_task_file_storage().is_content_addressed(task.file.name))
+        self.assertEqual(task.file.read(), b'0123456789')
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunk_that_loses_a_race_is_not_counted(self):
+        response = self.client.post(reverse('api_upload_list'), {'filename': 'memo.txt', 'size': 8},
+                                    content_type='application/json')
+        url = reverse('api_upload_detail', args=[response.json()['id']])
+        read = HttpRequest.read
+
+        def read_after_another_request(request, *args):
+            # A second request for the same offset finishes while this one reads.
+            UploadSession.objects.update(received=4)
+            return read(request, *args)
+
+        with mock.patch.object(HttpRequest, 'read', read_after_another_request):
+            response = self.put_chunk(url, 0, b'0123')
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 4))
+        self.assertTrue(self.put_chunk(url, 4, b'4567').json()['complete'])
+
+    def test_identical_files_are_stored_once_and_released_with_the_last_task(self):
+        first = make_task(self.officer, self.manager, file=SimpleUploadedFile('a.pdf', b'same content'))
+        second = make_task(self.officer, self.manager, file=SimpleUploadedFile('b.pdf', b'same content'))
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual((first.file_name, second.file_name), ('a.pdf', 'b.pdf'))
+        self.assertEqual(Blob.objects.get().refcount, 2)
+
+        path = first.file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        self.assertTrue(os.path.exists(path))
+
+        second = Task.objects.get(pk=second.pk)
+        second.file = SimpleUploadedFile('c.pdf', b'other content')
+        with mock.patch.object(notifications.process_attachment, 'delay'):
+            with self.captureOnCommitCallbacks(execute=True):
+                second.save()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(list(Blob.objects.values_list('name', 'refcount')), [(second.file.name, 1)])
+
+
+class TaskFileDownloadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, TASK_FILE_SENDFILE='')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        self.task = make_task(self.officer, self.manager, file=SimpleUploadedFile('notes.txt', b'0123456789'))
+        self.url = reverse('task_file', args=[self.task.pk])
+
+    def test_only_users_who_see_the_task_can_download(self):
+        self.client.force_login(make_user('other'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(self.officer)
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="notes.txt"')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_range_requests(self):
+        self.client.force_login(self.officer)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=20-').status_code, 416)
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_missing_files_are_not_found(self):
+        self.client.force_login(self.officer)
+        Task.objects.filter(pk=self.task.pk).update(file='task_files/gone.txt')  # From before content addressing
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        Task.objects.filter(pk=self.task.pk).update(file=self.task.file.name)
+        os.remove(self.task.file.path)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    @override_settings(TASK_FILE_SENDFILE='nginx')
+    def test_front_server_sends_the_file(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(self.url, {'download': 1})
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.task.file.name)
+        self.assertEqual(response.content, b'')
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+
+
+def make_docx(text):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w') as archive:
+        archive.writestr('word/document.xml', (
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+            f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p></w:body></w:document>'
+        ))
+    return output.getvalue()
+
+
+class AttachmentProcessingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.manager = make_user('manager', is_manager=True)
+
+    def test_extracted_text_is_searchable_and_shared(self):
+        content = make_docx('Quarterly procurement ledger')
+        with mock.patch.object(notifications.process_attachment, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                task = make_task(self.manager, self.manager, file=SimpleUploadedFile('ledger.docx', content))
+        blob = Blob.objects.get()
+        delay.assert_called_once_with(blob.id)
+        self.assertFalse(Task.objects.search('procurement').exists())
+
+        self.assertTrue(notifications.process_attachment(blob.id))
+        self.assertFalse(notifications.process_attachment(blob.id))  # Already done
+        task.refresh_from_db()
+        self.assertEqual(task.attachment_text, 'Quarterly procurement ledger')
+        self.assertEqual(list(Task.objects.search('procurement')), [task])
+        self.assertIn('\x02procurement\x03', Task.objects.search('procurement').get().search_snippet)
+
+        # Same content again: nothing to process, text is there immediately.
+        with mock.patch.object(notifications.process_attachment, 'delay') as delay:
+            copy = make_task(self.manager, self.manager, file=SimpleUploadedFile('copy.docx', content))
+        delay.assert_not_called()
+        self.assertEqual(set(Task.objects.search('ledger')), {task, copy})
+
+    def test_missing_pdf_library_is_logged_once(self):
+        with mock.patch.dict(sys.modules, {'pypdf': None}), mock.patch.object(attachments, '_missing_warned', set()):
+            with self.assertLogs('tasks.attachments', 'WARNING') as logs:
+                self.assertEqual(attachments.extract(io.BytesIO(b'%PDF-1.7 ...')), ('', None))
+                attachments.extract(io.BytesIO(b'%PDF-1.7 ...'))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('pypdf is not installed', logs.output[0])
+
+
+class CopyDatabaseTests(TestCase):
+    def make_source(self):
+        # A migrated SQLite file with some data in it: the test database with
+        # rows that are rolled back again once it has been backed up.
+        path = os.path.join(tempfile.mkdtemp(), 'source.sqlite3')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        try:
+            with transaction.atomic():
+                manager = make_user('manager', is_manager=True)
+                officer = make_user('officer')
+                task = make_task(officer, manager, deadline=timezone.now() - timedelta(days=1))
+                Reminder.objects.create(user=officer, created_by=manager).tasks.add(task)
+                Task.objects.filter(pk=task.pk).bulk_change(status='draft')
+                dump = [sql for sql in connection.connection.iterdump() if '_fts' not in sql]  # Search index
+                with closing(sqlite3.connect(path)) as target:
+                    target.executescript(';\n'.join(dump))
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        return path
+
+    def copy_database(self, source):
+        # The command opens the source under its own alias for the length of the copy.
+        with mock.patch.object(type(self), 'databases', {'default', copy_database.SOURCE_ALIAS}):
+            call_command('copy_database', source=source, stdout=io.StringIO())
+
+    def test_copies_every_row(self):
+        source = self.make_source()
+        self.assertFalse(User.objects.exists())
+        self.copy_database(source)
+        with closing(sqlite3.connect(source)) as copied:
+            for model in (User, Profile, Task, TaskEvent, Reminder, Reminder.tasks.through):
+                with self.subTest(model=model._meta.label):
+                    expected = copied.execute(f'SELECT count(*) FROM "{model._meta.db_table}"').fetchone()[0]
+                    self.assertTrue(expected)
+                    self.assertEqual(model.objects.count(), expected)
+        self.assertEqual(list(Task.objects.search('task')), list(Task.objects.all()))
+
+    def test_refuses_a_database_with_rows(self):
+        source = self.make_source()
+        make_user('existing')
+        with self.assertRaisesMessage(CommandError, 'already has rows'):
+            self.copy_database(source)
+
+
+class AuthenticationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.client.login(username='manager', password='password')
+
+    def test_warm_requests_do_not_touch_the_database(self):
+        url = reverse('task_list')
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_saving_the_user_drops_the_cached_copy(self):
+        self.client.get(reverse('task_list'))
+        self.manager.set_password('changed')
+        self.manager.save()
+        response = self.client.get(reverse('task_list'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('task_list')}", fetch_redirect_response=False)
+
+    def test_sessions_from_the_model_backend_stay_logged_in(self):
+        self.client.logout()
+        self.client.force_login(self.manager, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(reverse('task_list')).status_code, 200)
+
+    @override_settings(AUTH_USER_CACHE_SECONDS=0)
+    def test_bulk_updates_are_seen_once_the_entry_expires(self):
+        self.client.get(reverse('task_list'))
+        User.objects.filter(pk=self.manager.pk).update(is_active=False)
+        response = self.client.get(reverse('task_list'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('task_list')}", fetch_redirect_response=False)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.manager = make_user('manager', is_manager=True)
+        self.officer = make_user('officer')
+        for index in range(5):
+            task = make_task(self.officer, self.manager, title=f"Task {index}", deadline=timezone.now() - timedelta(days=1))
+            Reminder.objects.create(user=self.officer, created_by=self.manager).tasks.add(task)
+
+    def test_views_stay_within_their_query_budgets(self):
+        pages = [
+            (self.manager, 'task_list'),
+            (self.manager, 'manager_dashboard'),
+            (self.manager, 'archived_dashboard'),
+            (self.officer, 'employee_dashboard'),
+            (self.manager, 'api_task_list'),
+            (self.officer, 'api_reminder_list'),
+        ]
+        for user, url_name in pages:
+            with self.subTest(url_name=url_name):
+                cache.clear()
+                self.client.force_login(user)
+                response = self.client.get(reverse(url_name))
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(response.metrics.queries, settings.QUERY_BUDGETS[url_name])
+                if not url_name.startswith('api_'):
+                    self.assertGreater(response.metrics.render_time, 0)
+
+    def test_metrics_endpoint(self):
+        self.client.force_login(self.manager)
+        self.client.get(reverse('task_list'))
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with self.settings(METRICS_TOKEN='secret'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertContains(response, 'eoffice_requests_total{view="task_list",method="GET",status="200"} 1')
+        self.assertContains(response, 'eoffice_request_duration_seconds_count{view="task_list"} 1')
+
+
+class BenchmarkCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_seeded_data_is_benchmarked(self):
+        call_command(
+            'seed_benchmark_data', officers=3, managers=1, tasks=40, archived=10, attachments=2, stdout=io.StringIO(),
+        )
+        self.assertEqual(set(TaskEvent.objects.filter(from_status='').values_list('task_id', flat=True)),
+                         set(Task.objects.values_list('id', flat=True)) | set(ArchivedTask.objects.values_list('id', flat=True)))
+        self.assertTrue(OverdueSummary.objects.exists())
+
+        out = io.StringIO()
+        with mock.patch.object(notifications.coalesce_notification, 'delay'):
+            call_command('benchmark_views', iterations=2, warmup=0, host='testserver', stdout=out, stderr=io.StringIO())
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(set(results), {
+            'task_list', 'manager_dashboard', 'employee_dashboard', 'archived_dashboard',
+            'task_direct_status_update', 'send_reminder',
+        })
+        self.assertTrue(all(result['queries'] for result in results.values()))
+        self.assertEqual(TaskEvent.objects.filter(from_status='finalized-draft', to_status='draft').count(), 1)
+
+    def test_iterations_must_be_positive(self):
+        with self.assertRaisesMessage(CommandError, "--iterations must be at least 1."):
+            call_command('benchmark_views', iterations=0, stdout=io.StringIO())
+
+
+class ImportDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.manager = make_user('manager', is_manager=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def import_data(self, **options):
+        out, err = io.StringIO(), io.StringIO()
+        try:
+            call_command('import_data', stdout=out, stderr=err, **options)
+        finally:
+            self.errors = err.getvalue()
+        return out.getvalue()
+
+    def test_users_and_their_tasks_are_imported(self):
+        users = self.write('users.csv', (
+            "username,email,password,phone_number,is_manager\n"
+            "ama,ama@example.com,s3cret-pass,+233241234567,\n"
+            "kofi,,,,yes\n"
+        ))
+        tasks = self.write('tasks.json', json.dumps([
+            {'title': 'Budget memo', 'assignee': 'ama', 'created_by': 'manager', 'deadline': '2020-01-31'},
+            {'title': 'Leave roster', 'assignee': 'ama', 'created_by': 'kofi', 'status': 'draft', 'is_archived': True},
+        ]))
+        output = self.import_data(users=users, tasks=tasks, batch_size=1)
+        self.assertIn('Imported 2 users, 2 tasks.', output)
+
+        ama = User.objects.get(username='ama')
+        self.assertTrue(ama.check_password('s3cret-pass'))
+        self.assertEqual(ama.profile.phone_number, '+233241234567')
+        self.assertFalse(User.objects.get(username='kofi').has_usable_password())
+        self.assertTrue(is_manager(User.objects.get(username='kofi')))
+        task = Task.objects.get(title='Budget memo')
+        self.assertEqual(timezone.localtime(task.deadline).strftime('%Y-%m-%d %H:%M'), '2020-01-31 23:59')
+        self.assertEqual(list(TaskEvent.objects.timeline(task.pk).values_list('actor__username', 'to_status')),
+                         [('manager', 'dispatched-officer')])
+        self.assertEqual(OverdueSummary.objects.get().officer, ama)
+        self.assertTrue(ArchivedTask.objects.filter(title='Leave roster').exists())
+
+    def test_duplicate_usernames_reject_the_whole_file(self):
+        users = self.write('users.csv', "username,email\nama,\nama,\nmanager,\n")
+        with self.assertRaisesMessage(CommandError, 'Nothing was imported'):
+            self.import_data(users=users)
+        self.assertIn('users.csv:3: username ama appears twice', self.errors)
+        self.assertIn('already registered: manager', self.errors)
+        self.assertFalse(User.objects.filter(username='ama').exists())
+
+    def test_dry_run_only_validates(self):
+        users = self.write('users.csv', "username\nama\n")
+        tasks = self.write('tasks.csv', "title,assignee,created_by\nBudget memo,ama,manager\n")
+        output = self.import_data(users=users, tasks=tasks, dry_run=True)
+        self.assertIn('Valid: 1 users, 1 tasks. Nothing was imported (dry run).', output)
+        self.assertFalse(User.objects.filter(username='ama').exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_bad_rows_are_reported_by_line(self):
+        tasks = self.write('tasks.csv', (
+            "title,assignee,created_by,deadline\n"
+            "Budget memo,manager,manager,2020-01-31 17:00\n"
+            "Leave roster,manager,manager,next week\n"
+            "Audit,nobody,manager,\n"
+        ))
+        with self.assertRaisesMessage(CommandError, 'Nothing was imported'):
+            self.import_data(tasks=tasks)
+        self.assertIn('tasks.csv:3: invalid deadline next week', self.errors)
+        self.assertIn('tasks.csv:4: assignee nobody is not a user', self.errors)
+        self.assertFalse(Task.objects.exists())
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('login/', views.CustomLoginView.as_view(), name='login'),
@@ -9,9 +9,29 @@ urlpatterns = [
     path('manager/dashboard/', views.ManagerDashboardView.as_view(), name='manager_dashboard'),
     path('employee/dashboard/', views.EmployeeDashboardView.as_view(), name='employee_dashboard'),
     path('archived/dashboard/', views.ArchivedDashboardView.as_view(), name='archived_dashboard'),
+    path('export/<str:format>/', views.TaskExportView.as_view(), name='task_export'),
+    path('archived/<int:pk>/restore/', views.ArchivedTaskRestoreView.as_view(), name='archived_task_restore'),
+    path('archived/export/<str:format>/', views.TaskExportView.as_view(archived=True), name='archived_export'),
+    path('assignees/autocomplete/', views.AssigneeAutocompleteView.as_view(), name='assignee_autocomplete'),
+    path('events/', views.TaskEventStreamView.as_view(), name='task_events'),
     path('task/create/', views.TaskCreateView.as_view(), name='task_create'),
     path('task/update/<int:pk>/', views.TaskUpdateView.as_view(), name='task_update'),
     path('task/status/<int:pk>/', views.TaskStatusUpdateView.as_view(), name='task_status_update'),
     path('task/status-update/<int:pk>/<str:status>/', views.TaskDirectStatusUpdateView.as_view(), name='task_direct_status_update'),
+    path('task/<int:pk>/file/', views.TaskFileView.as_view(), name='task_file'),
+    path('task/<int:pk>/preview/', views.TaskFilePreviewView.as_view(), name='task_file_preview'),
+    path('task/bulk/', views.TaskBulkActionView.as_view(), name='task_bulk_action'),
     path('send-reminder/<int:user_id>/', views.SendReminderView.as_view(), name='send_reminder'),
+    path('reminder/<int:reminder_id>/dismiss/', views.DismissReminderView.as_view(), name='dismiss_reminder'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+    path('api/tasks/', api.TaskListApiView.as_view(), name='api_task_list'),
+    path('api/tasks/bulk/', api.TaskBulkApiView.as_view(), name='api_task_bulk'),
+    path('api/tasks/<int:pk>/', api.TaskDetailApiView.as_view(), name='api_task_detail'),
+    path('api/tasks/<int:pk>/events/', api.TaskEventListApiView.as_view(), name='api_task_events'),
+    path('api/reminders/', api.ReminderListApiView.as_view(), name='api_reminder_list'),
+    path('api/reminders/<int:pk>/', api.ReminderDetailApiView.as_view(), name='api_reminder_detail'),
+    path('api/profiles/', api.ProfileListApiView.as_view(), name='api_profile_list'),
+    path('api/profiles/<int:user_id>/', api.ProfileDetailApiView.as_view(), name='api_profile_detail'),
+    path('api/uploads/', api.UploadSessionApiView.as_view(), name='api_upload_list'),
+    path('api/uploads/<uuid:pk>/', api.UploadChunkApiView.as_view(), name='api_upload_detail'),
 ]
\ No newline at end of file
@@ -4,11 +4,26 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.shortcuts import redirect, render
-from django.db.models import Q
-from .models import Task, Reminder
-from .forms import TaskForm, SignUpForm
+from django.utils.crypto import constant_time_compare
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from asgiref.sync import sync_to_async
+import json
+import os
+from .models import ArchivedTask, Blob, Task, Reminder, OverdueSummary
+from .conditional import ConditionalGetMixin, mark_data_changed
+from .directory import search_assignees
+from .downloads import serve_file
+from .events import MANAGERS_CHANNEL, can_stream, get_broker, user_channel
+from .exports import export_rows, stream_csv, stream_xlsx
+from .metrics import registry
+from .forms import BulkTaskActionForm, TaskForm, SignUpForm
+from .pagination import KeysetPaginationMixin
+from .permissions import ManagerRequiredMixin, can_edit_task, is_manager
+from .storage import get_task_file_storage
 from django.contrib.auth.models import User
-from .tasks import send_task_assignment_notification
+from .tasks import queue_task_assignment_notification
 from django.utils import timezone
 
 class CustomLoginView(LoginView):
@@ -19,7 +34,7 @@ class CustomLoginView(LoginView):
     def get_success_url(self):
         user = self.request.user
         if user.is_authenticated:
-            if user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager):
+            if is_manager(user):
                 return reverse_lazy('manager_dashboard')
             return reverse_lazy('employee_dashboard')
         return super().get_success_url()
@@ -41,122 +56,85 @@ class CustomLogoutView(LogoutView):
         messages.success(request, "You have been logged out successfully.")
         return super().dispatch(request, *args, **kwargs)
 
-class TaskListView(LoginRequiredMixin, ListView):
+def set_countdowns(tasks, now):
+    # Calculate countdown for each task
+    for task in tasks:
+        if task.deadline:
+            time_left = task.deadline - now
+            task.countdown = {
+                'days': time_left.days,
+                'hours': time_left.seconds // 3600,
+                'is_overdue': time_left.total_seconds() < 0
+            }
+        else:
+            task.countdown = None
+
+class TaskListView(LoginRequiredMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     model = Task
     template_name = 'tasks/task_list.html'
     context_object_name = 'tasks'
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Task.objects.filter(is_archived=False)
-        if not (user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager)):
-            queryset = queryset.filter(assignee=user)
-        
-        status = self.request.GET.get('status')
-        assignee = self.request.GET.get('assignee')
-        search = self.request.GET.get('search')
-        
-        if status:
-            queryset = queryset.filter(status=status)
-        if assignee and (user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager)):
-            queryset = queryset.filter(assignee__username=assignee)
-        if search:
-            queryset = queryset.filter(Q(title__icontains=search) | Q(description__icontains=search))
-        
-        return queryset
+        return (
+            Task.objects.active()
+            .visible_to(user)
+            .filtered(self.request.GET, allow_assignee=self.request.is_manager)
+            .for_listing()
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['status_choices'] = Task.STATUS_CHOICES
-        context['assignees'] = User.objects.all() if (self.request.user.is_superuser or (hasattr(self.request.user, 'profile') and self.request.user.profile.is_manager)) else []
+        context['bulk_form'] = BulkTaskActionForm(user=self.request.user)
         return context
 
-class ManagerDashboardView(LoginRequiredMixin, ListView):
+class ManagerDashboardView(LoginRequiredMixin, ManagerRequiredMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     model = Task
     template_name = 'tasks/manager_dashboard.html'
     context_object_name = 'tasks'
+    permission_denied_message = "Only managers can access the manager dashboard."
 
     def get_queryset(self):
-        user = self.request.user
-        if not (user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager)):
-            messages.error(self.request, "Only managers can access the manager dashboard.")
-            return Task.objects.none()
-        
-        queryset = Task.objects.filter(is_archived=False)
-        
-        status = self.request.GET.get('status')
-        assignee = self.request.GET.get('assignee')
-        search = self.request.GET.get('search')
-        
-        if status:
-            queryset = queryset.filter(status=status)
-        if assignee:
-            queryset = queryset.filter(assignee__username=assignee)
-        if search:
-            queryset = queryset.filter(Q(title__icontains=search) | Q(description__icontains=search))
-        
-        return queryset
+        return Task.objects.active().filtered(self.request.GET).for_listing()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['status_choices'] = Task.STATUS_CHOICES
-        context['assignees'] = User.objects.all()
+        context['bulk_form'] = BulkTaskActionForm(user=self.request.user)
 
-        # Calculate countdown for each task
-        now = timezone.now()
-        for task in context['tasks']:
-            if task.deadline:
-                time_left = task.deadline - now
-                task.countdown = {
-                    'days': time_left.days,
-                    'hours': time_left.seconds // 3600,
-                    'is_overdue': time_left.total_seconds() < 0
-                }
-            else:
-                task.countdown = None
-
-        # Get officers with overdue tasks
-        overdue_tasks = Task.objects.filter(
-            is_archived=False,
-            deadline__lt=now,
-            status__in=['dispatched-officer', 'draft', 'finalized-draft']
-        ).select_related('assignee')
-        
-        overdue_officers = {}
-        for task in overdue_tasks:
-            officer = task.assignee
-            if officer not in overdue_officers:
-                overdue_officers[officer] = []
-            overdue_officers[officer].append(task)
-        
+        set_countdowns(context['tasks'], timezone.now())
+
+        # Officers with overdue tasks, from the precomputed rollup
+        summaries = OverdueSummary.objects.select_related('officer').only(
+            'overdue_count', 'oldest_deadline', 'tasks', 'officer__id', 'officer__username',
+        ).order_by('oldest_deadline')
         context['overdue_officers'] = [
             {
-                'officer': officer,
-                'tasks': tasks,
-                'reminder_url': reverse_lazy('send_reminder', kwargs={'user_id': officer.id})
+                'officer': summary.officer,
+                'overdue_count': summary.overdue_count,
+                'oldest_deadline': summary.oldest_deadline,
+                'tasks': summary.listed_tasks(),
+                'more_count': summary.overdue_count - len(summary.tasks),
+                'reminder_url': reverse_lazy('send_reminder', kwargs={'user_id': summary.officer_id})
             }
-            for officer, tasks in overdue_officers.items()
+            for summary in summaries
         ]
         
         return context
 
-class EmployeeDashboardView(LoginRequiredMixin, ListView):
+class EmployeeDashboardView(LoginRequiredMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     model = Task
     template_name = 'tasks/employee_dashboard.html'
     context_object_name = 'tasks'
 
     def get_queryset(self):
-        queryset = Task.objects.filter(assignee=self.request.user, is_archived=False)
-        
-        status = self.request.GET.get('status')
-        search = self.request.GET.get('search')
-        
-        if status:
-            queryset = queryset.filter(status=status)
-        if search:
-            queryset = queryset.filter(Q(title__icontains=search) | Q(description__icontains=search))
-        
-        return queryset
+        return (
+            Task.objects.active()
+            .filter(assignee=self.request.user)
+            .filtered(self.request.GET, allow_assignee=False)
+            .for_listing()
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -164,14 +142,8 @@ class EmployeeDashboardView(LoginRequiredMixin, ListView):
         
         # Add reminders for overdue tasks
         now = timezone.now()
-        reminders = Reminder.objects.filter(
-            user=self.request.user,
-            is_active=True,
-            is_dismissed=False,
-            tasks__is_archived=False,
-            tasks__deadline__lt=now,
-            tasks__status__in=['dispatched-officer', 'draft', 'finalized-draft']
-        ).distinct()
+        set_countdowns(context['tasks'], now)
+        reminders = Reminder.objects.pending_for(self.request.user, now)
         
         context['reminders'] = [
             {
@@ -186,57 +158,124 @@ class EmployeeDashboardView(LoginRequiredMixin, ListView):
         
         return context
 
-class ArchivedDashboardView(LoginRequiredMixin, ListView):
-    model = Task
+class ArchivedDashboardView(LoginRequiredMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
+    model = ArchivedTask
     template_name = 'tasks/archived_dashboard.html'
     context_object_name = 'tasks'
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Task.objects.filter(is_archived=True)
-        if not (user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager)):
-            queryset = queryset.filter(assignee=user)
-        
-        status = self.request.GET.get('status')
-        assignee = self.request.GET.get('assignee')
-        search = self.request.GET.get('search')
-        
-        if status:
-            queryset = queryset.filter(status=status)
-        if assignee and (user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager)):
-            queryset = queryset.filter(assignee__username=assignee)
-        if search:
-            queryset = queryset.filter(Q(title__icontains=search) | Q(description__icontains=search))
-        
-        return queryset
+        return (
+            ArchivedTask.objects
+            .visible_to(user)
+            .filtered(self.request.GET, allow_assignee=self.request.is_manager)
+            .for_listing()
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['status_choices'] = Task.STATUS_CHOICES
-        context['assignees'] = User.objects.all() if (self.request.user.is_superuser or (hasattr(self.request.user, 'profile') and self.request.user.profile.is_manager)) else []
         return context
 
-class TaskCreateView(LoginRequiredMixin, CreateView):
+class AssigneeAutocompleteView(LoginRequiredMixin, View):
+    def get(self, request):
+        if not request.is_manager:
+            return JsonResponse({'error': "Only managers can look up assignees."}, status=403)
+        return JsonResponse({'results': search_assignees(request.GET.get('q', ''))})
+
+class TaskEventStreamView(View):
+    """
+    Server-sent events for the signed-in user's tasks and reminders (and every
+    task, for managers). Holds the connection open, so serve it over ASGI.
+    """
+
+    async def get(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponse(status=401)  # EventSource can't follow the login redirect
+        if not can_stream(request):
+            return HttpResponse(status=204)  # Tells EventSource to stop reconnecting
+        channels = [user_channel(user.pk)]
+        if await sync_to_async(is_manager)(user):
+            channels.append(MANAGERS_CHANNEL)
+        response = StreamingHttpResponse(self.stream(channels), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Don't let nginx hold events back
+        return response
+
+    async def stream(self, channels):
+        subscription = get_broker().subscribe(channels)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                event = await subscription.get(settings.TASK_EVENTS_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ': keepalive\n\n'
+                else:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            await subscription.close()
+
+def get_task_with_file(user, pk, *fields):
+    # Anyone who can see the task, live or archived, can read its attachment, nobody else.
+    for model in (Task, ArchivedTask):
+        task = model.objects.visible_to(user).exclude(file='').only(*fields).filter(pk=pk).first()
+        if task:
+            return task
+    raise Http404("No file for this task.")
+
+class TaskFileView(LoginRequiredMixin, View):
+    def get(self, request, pk):
+        task = get_task_with_file(request.user, pk, 'file', 'file_name')
+        filename = task.file_name or os.path.basename(task.file.name)
+        return serve_file(request, get_task_file_storage(), task.file.name, filename)
+
+class TaskFilePreviewView(LoginRequiredMixin, View):
+    def get(self, request, pk):
+        task = get_task_with_file(request.user, pk, 'file')
+        preview = Blob.objects.filter(name=task.file.name).exclude(preview='').values_list('preview', flat=True).first()
+        if not preview:
+            raise Http404("No preview for this file.")
+        return serve_file(request, get_task_file_storage(), preview, 'preview.jpg')
+
+class TaskExportView(LoginRequiredMixin, ManagerRequiredMixin, View):
+    permission_denied_message = "Only managers can export tasks."
+    archived = False
+    formats = {
+        'csv': (stream_csv, 'text/csv'),
+        'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    }
+
+    def get(self, request, format):
+        if format not in self.formats:
+            raise Http404("Unknown export format.")
+        stream, content_type = self.formats[format]
+        queryset = ArchivedTask.objects.all() if self.archived else Task.objects.active()
+        queryset = queryset.filtered(request.GET)
+        ordering = ('-search_rank', '-id') if request.GET.get('search') else ('-updated_at', '-id')
+
+        response = StreamingHttpResponse(stream(export_rows(queryset.order_by(*ordering))), content_type=content_type)
+        filename = f"{'archived-tasks' if self.archived else 'tasks'}-{timezone.localdate():%Y%m%d}.{format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class TaskCreateView(LoginRequiredMixin, ManagerRequiredMixin, CreateView):
     model = Task
     form_class = TaskForm
     template_name = 'tasks/task_form.html'
     success_url = reverse_lazy('task_list')
+    permission_denied_message = "Only managers can create tasks."
+    permission_denied_url = 'task_list'
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['user'] = self.request.user
         return kwargs
 
-    def dispatch(self, request, *args, **kwargs):
-        if not (request.user.is_superuser or (hasattr(request.user, 'profile') and request.user.profile.is_manager)):
-            messages.error(request, "Only managers can create tasks.")
-            return redirect('task_list')
-        return super().dispatch(request, *args, **kwargs)
-
     def form_valid(self, form):
         form.instance.created_by = self.request.user
         response = super().form_valid(form)
-        send_task_assignment_notification(form.instance.id, form.instance.assignee.id)
+        queue_task_assignment_notification(form.instance.id, form.instance.assignee_id)
         messages.success(self.request, "Task created successfully.")
         return response
 
@@ -252,23 +291,14 @@ class TaskUpdateView(LoginRequiredMixin, UpdateView):
         return kwargs
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager):
-            return Task.objects.all()
-        return Task.objects.filter(assignee=user)
-
-    def dispatch(self, request, *args, **kwargs):
-        task = self.get_object()
-        if not (request.user == task.assignee or request.user.is_superuser or (hasattr(request.user, 'profile') and user.profile.is_manager)):
-            messages.error(request, "You are not authorized to update this task.")
-            return redirect('task_list')
-        return super().dispatch(request, *args, **kwargs)
+        # Tasks the user may not edit are simply not found.
+        return Task.objects.visible_to(self.request.user)
 
     def form_valid(self, form):
-        original_task = Task.objects.get(id=form.instance.id)
+        original_assignee_id = Task.objects.filter(id=form.instance.id).values_list('assignee_id', flat=True).get()
         response = super().form_valid(form)
-        if original_task.assignee != form.instance.assignee:
-            send_task_assignment_notification(form.instance.id, form.instance.assignee.id)
+        if original_assignee_id != form.instance.assignee_id:
+            queue_task_assignment_notification(form.instance.id, form.instance.assignee_id)
         messages.success(self.request, "Task updated successfully.")
         return response
 
@@ -279,25 +309,18 @@ class TaskStatusUpdateView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy('task_list')
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager):
-            return Task.objects.all()
-        return Task.objects.filter(assignee=user)
-
-    def dispatch(self, request, *args, **kwargs):
-        task = self.get_object()
-        if not (request.user == task.assignee or request.user.is_superuser or (hasattr(request.user, 'profile') and user.profile.is_manager)):
-            messages.error(request, "You are not authorized to update this task.")
-            return redirect('task_list')
-        return super().dispatch(request, *args, **kwargs)
+        # Tasks the user may not edit are simply not found.
+        return Task.objects.visible_to(self.request.user)
 
     def form_valid(self, form):
+        form.instance.changed_by = self.request.user
         response = super().form_valid(form)
         messages.success(self.request, f"Task status updated to {form.instance.status}.")
         
         # Deactivate reminders if task is completed
         if form.instance.status == 'signed-dispatched':
             Reminder.objects.filter(tasks=form.instance, user=self.request.user, is_active=True).update(is_active=False)
+            mark_data_changed()
         
         return response
 
@@ -312,41 +335,60 @@ class TaskDirectStatusUpdateView(LoginRequiredMixin, View):
         }
         try:
             task = Task.objects.get(pk=pk)
-            if not (user == task.assignee or user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager)):
+            if not can_edit_task(user, task):
                 messages.error(request, "You are not authorized to update this task.")
                 return redirect('employee_dashboard')
             
             if status in status_map:
                 task.status = status_map[status]
+                task.changed_by = user
                 task.save()
                 messages.success(request, f"Task status updated to {task.get_status_display()}.")
                 
                 # Deactivate reminders if task is completed
                 if task.status == 'signed-dispatched':
                     Reminder.objects.filter(tasks=task, user=task.assignee, is_active=True).update(is_active=False)
+                    mark_data_changed()
             else:
                 messages.error(request, "Invalid status.")
                 
         except Task.DoesNotExist:
             messages.error(request, "Task does not exist.")
             
-        return redirect('employee_dashboard' if not (user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager)) else 'manager_dashboard')
+        return redirect('manager_dashboard' if request.is_manager else 'employee_dashboard')
+
+class TaskBulkActionView(LoginRequiredMixin, View):
+    def post(self, request):
+        form = BulkTaskActionForm(request.POST, user=request.user)
+        if not form.is_valid():
+            for errors in form.errors.values():
+                messages.error(request, errors[0])
+            return redirect(self.get_redirect_url())
+
+        changed = form.save()
+        action = form.cleaned_data['action']
+        if action == 'status':
+            status = dict(Task.STATUS_CHOICES)[form.cleaned_data['status']]
+            messages.success(request, f"{len(changed)} task(s) updated to {status}.")
+        elif action == 'archive':
+            messages.success(request, f"{len(changed)} task(s) archived.")
+        else:
+            messages.success(request, f"{len(changed)} task(s) reassigned to {form.cleaned_data['assignee'].username}.")
+        return redirect(self.get_redirect_url())
+
+    def get_redirect_url(self):
+        next_url = self.request.POST.get('next')
+        if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={self.request.get_host()}):
+            return next_url
+        return 'manager_dashboard' if self.request.is_manager else 'employee_dashboard'
+
+class SendReminderView(LoginRequiredMixin, ManagerRequiredMixin, View):
+    permission_denied_message = "Only managers can send reminders."
 
-class SendReminderView(LoginRequiredMixin, View):
     def get(self, request, user_id):
-        user = request.user
-        if not (user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager)):
-            messages.error(request, "Only managers can send reminders.")
-            return redirect('manager_dashboard')
-        
         try:
             assignee = User.objects.get(id=user_id)
-            overdue_tasks = Task.objects.filter(
-                assignee=assignee,
-                is_archived=False,
-                deadline__lt=timezone.now(),
-                status__in=['dispatched-officer', 'draft', 'finalized-draft']
-            )
+            overdue_tasks = Task.objects.overdue().filter(assignee=assignee).only('id', 'title', 'deadline')
             
             return render(request, 'tasks/send_reminder.html', {
                 'assignee': assignee,
@@ -359,22 +401,12 @@ class SendReminderView(LoginRequiredMixin, View):
 
     def post(self, request, user_id):
         user = request.user
-        if not (user.is_superuser or (hasattr(user, 'profile') and user.profile.is_manager)):
-            messages.error(request, "Only managers can send reminders.")
-            return redirect('manager_dashboard')
-        
         try:
             assignee = User.objects.get(id=user_id)
             task_ids = request.POST.getlist('tasks')
             message = request.POST.get('message')
             
-            overdue_tasks = Task.objects.filter(
-                id__in=task_ids,
-                assignee=assignee,
-                is_archived=False,
-                deadline__lt=timezone.now(),
-                status__in=['dispatched-officer', 'draft', 'finalized-draft']
-            )
+            overdue_tasks = Task.objects.overdue().filter(id__in=task_ids, assignee=assignee)
             
             if overdue_tasks.exists():
                 reminder = Reminder.objects.create(
@@ -393,6 +425,16 @@ class SendReminderView(LoginRequiredMixin, View):
             
         return redirect('manager_dashboard')
 
+class ArchivedTaskRestoreView(LoginRequiredMixin, ManagerRequiredMixin, View):
+    permission_denied_message = "Only managers can restore archived tasks."
+
+    def post(self, request, pk):
+        if not ArchivedTask.objects.filter(pk=pk).restore():
+            messages.error(request, "Archived task does not exist.")
+            return redirect('archived_dashboard')
+        messages.success(request, "Task restored from the archive.")
+        return redirect('task_update', pk=pk)
+
 class DismissReminderView(LoginRequiredMixin, View):
     def post(self, request, reminder_id):
         try:
@@ -422,4 +464,12 @@ class SignUpView(CreateView):
         if request.user.is_authenticated:
             messages.info(request, "You are already logged in.")
             return redirect('task_list')
-        return super().dispatch(request, *args, **kwargs)
\ No newline at end of file
+        return super().dispatch(request, *args, **kwargs)
+
+class MetricsView(View):
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        bearer = request.headers.get('Authorization', '')
+        if not (request.user.is_staff or (token and constant_time_compare(bearer, f"Bearer {token}"))):
+            return HttpResponse(status=403)
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')